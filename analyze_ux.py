@@ -1,57 +1,16 @@
 import json
+import glob
 import pandas as pd
 from datetime import datetime
 import os
 import sys
-import time
+import artifact_store
+import lighthouse_parser
+import report_catalog
+from stage_timing import timed
 
-# === Setup ===
-version_dir = sys.argv[1] if len(sys.argv) > 1 else "artifacts"
-REPORT_JSON = os.path.join(version_dir, "report.json")
-META_FILE = os.path.join(version_dir, "report_meta.json")
-
-# Wait for report.json (max 5 seconds)
-for _ in range(10):
-    if os.path.exists(REPORT_JSON):
-        break
-    time.sleep(0.5)
-
-if not os.path.exists(REPORT_JSON):
-    raise FileNotFoundError(f"Missing Lighthouse report: {REPORT_JSON}")
-
-if not os.path.exists(META_FILE):
-    raise FileNotFoundError(f"Missing metadata file: {META_FILE}")
-
-# === Load Metadata ===
-with open(META_FILE) as f:
-    meta = json.load(f)
-
-site = meta.get("site", "unknown")
-timestamp = meta.get("timestamp", datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))
-serial = meta.get("serial", "000000")
-
-base_filename = f"ux_report_{site}_{timestamp}_{serial}"
-report_dir = version_dir  # Output to same directory as report.json
-
-csv_path = os.path.join(report_dir, f"{base_filename}.csv")
-json_path = os.path.join(report_dir, f"{base_filename}.json")
-
-# === Load Lighthouse JSON ===
-with open(REPORT_JSON, "r") as file:
-    data = json.load(file)
-
-rows = []
-
-# === Core Scores ===
-categories = data.get("categories", {})
-for cat in ["performance", "accessibility", "seo", "best-practices"]:
-    score = categories.get(cat, {}).get("score")
-    if score is not None:
-        rows.append((f"Score: {cat.title()}", round(score * 100)))
-
-# === Timing Metrics ===
-audits = data.get("audits", {})
-metrics = {
+CATEGORIES = ["performance", "accessibility", "seo", "best-practices"]
+METRICS = {
     "first-contentful-paint": "First Contentful Paint",
     "largest-contentful-paint": "Largest Contentful Paint",
     "total-blocking-time": "Total Blocking Time",
@@ -59,22 +18,110 @@ metrics = {
     "speed-index": "Speed Index",
     "interactive": "Time to Interactive",
 }
-for key, label in metrics.items():
-    value = audits.get(key, {}).get("numericValue")
-    if value is not None:
-        rows.append((label, round(value)))
-
-# === Violations ===
-violations = [val.get("title") for val in audits.values() if val.get("score") == 0 and val.get("title")]
 
-# === Save Reports ===
-df = pd.DataFrame(rows, columns=["Metric", "Value"])
-df.to_csv(csv_path, index=False)
 
-with open(json_path, "w") as f:
-    json.dump({
+def extract(data):
+    rows = []
+
+    # === Core Scores ===
+    categories = data.get("categories", {})
+    for cat in CATEGORIES:
+        score = categories.get(cat, {}).get("score")
+        if score is not None:
+            rows.append((f"Score: {cat.title()}", round(score * 100)))
+
+    # === Timing Metrics ===
+    audits = data.get("audits", {})
+    for key, label in METRICS.items():
+        value = audits.get(key, {}).get("numericValue")
+        if value is not None:
+            rows.append((label, round(value)))
+
+    # === Violations ===
+    violations = [val.get("title") for val in audits.values() if val.get("score") == 0 and val.get("title")]
+    return rows, violations
+
+
+def aggregate_runs(run_rows):
+    # Median / p75 / variance per metric across repeated Lighthouse runs
+    long = pd.DataFrame(
+        [(i, metric, value) for i, rows in enumerate(run_rows) for metric, value in rows],
+        columns=["Run", "Metric", "Value"],
+    )
+    grouped = long.groupby("Metric", sort=False)["Value"]
+    stats = pd.DataFrame({
+        "Value": grouped.median(),
+        "P75": grouped.quantile(0.75),
+        "Variance": grouped.var(ddof=1).fillna(0),
+        "Runs": grouped.count(),
+    }).reset_index()
+    return stats
+
+
+def analyze(version_dir="artifacts", timer=None, artifacts_dir=report_catalog.ARTIFACTS_DIR):
+    # Lighthouse has already finished by the time this is called, so a missing file is an error
+    report_json = artifact_store.resolve(os.path.join(version_dir, "report.json"))
+    meta_file = os.path.join(version_dir, "report_meta.json")
+
+    if report_json is None:
+        raise FileNotFoundError(f"Missing Lighthouse report: {os.path.join(version_dir, 'report.json')}")
+
+    if not os.path.exists(meta_file):
+        raise FileNotFoundError(f"Missing metadata file: {meta_file}")
+
+    # === Load Metadata ===
+    with open(meta_file) as f:
+        meta = json.load(f)
+
+    site = meta.get("site", "unknown")
+    timestamp = meta.get("timestamp", datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))
+    serial = meta.get("serial", "000000")
+
+    base_filename = f"ux_report_{site}_{timestamp}_{serial}"
+    csv_path = os.path.join(version_dir, f"{base_filename}.csv")
+    json_path = os.path.join(version_dir, f"{base_filename}.json")
+
+    # === Load Lighthouse JSON (scores, timings and audit titles only) ===
+    with timed(timer, "analysis.parse"):
+        data = lighthouse_parser.parse(report_json)
+        rows, violations = extract(data)
+
+    # === Multi-run Sampling ===
+    run_files = sorted(glob.glob(os.path.join(version_dir, "runs", "run_*.json*")))
+    if len(run_files) > 1:
+        with timed(timer, "analysis.aggregate_runs"):
+            df = aggregate_runs([extract(lighthouse_parser.parse(path))[0] for path in run_files])
+            rows = list(zip(df["Metric"], df["Value"]))
+    else:
+        df = pd.DataFrame(rows, columns=["Metric", "Value"])
+
+    # === Save Reports ===
+    with timed(timer, "analysis.save_csv"):
+        df.to_csv(csv_path, index=False)
+
+    summary = {
         "Core Scores": dict(rows),
         "Violations": violations
-    }, f, indent=2)
-
-print(f"✅ Saved:\n- CSV: {csv_path}\n- JSON: {json_path}")
\ No newline at end of file
+    }
+    if "Runs" in df:
+        summary["Run Statistics"] = {
+            r["Metric"]: {"median": r["Value"], "p75": r["P75"], "variance": r["Variance"], "runs": int(r["Runs"])}
+            for r in df.to_dict("records")
+        }
+    with timed(timer, "analysis.save_json"):
+        with open(json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    # === Update Report Catalog ===
+    with timed(timer, "analysis.catalog"):
+        report_catalog.add_report(csv_path, meta, rows, violations, stats=summary.get("Run Statistics"),
+                                  artifacts_dir=artifacts_dir)
+
+    return {"csv": csv_path, "json": json_path, **summary}
+
+
+if __name__ == "__main__":
+    # python analyze_ux.py [version_dir] [artifacts_dir]
+    report = analyze(sys.argv[1] if len(sys.argv) > 1 else "artifacts",
+                     artifacts_dir=sys.argv[2] if len(sys.argv) > 2 else report_catalog.ARTIFACTS_DIR)
+    print(f"✅ Saved:\n- CSV: {report['csv']}\n- JSON: {report['json']}")
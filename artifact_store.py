@@ -0,0 +1,147 @@
+import glob
+import gzip
+import os
+import shutil
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import job_runner
+import report_catalog
+
+# Storage for raw Lighthouse output. report.json / report.html (and sampled runs)
+# are kept gzip-compressed inside each audit folder and read back transparently;
+# a retention policy prunes raw files from old audits while the extracted metrics
+# (CSV, JSON and the catalog) are kept forever. Files of background jobs that ended
+# before the cutoff are deleted too.
+COMPRESS = os.environ.get("ARTIFACT_COMPRESS", "1") == "1"
+RETENTION_DAYS = int(os.environ.get("ARTIFACT_RETENTION_DAYS", 30))
+RETENTION_MODE = os.environ.get("ARTIFACT_RETENTION_MODE", "downsample")  # "prune" or "downsample"
+
+RAW_PATTERNS = ("report.json", "report.json.gz", "report.html", "report.html.gz", "runs")
+
+
+def store(src, dest):
+    # Move `src` to `dest` (as `dest`.gz when compression is on); returns the stored path
+    if not COMPRESS:
+        shutil.move(src, dest)
+        return dest
+    with open(src, "rb") as f_in, gzip.open(dest + ".gz", "wb", compresslevel=6) as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(src)
+    return dest + ".gz"
+
+
+def write_bytes(dest, data):
+    if not COMPRESS:
+        with open(dest, "wb") as f:
+            f.write(data)
+        return dest
+    with gzip.open(dest + ".gz", "wb", compresslevel=6) as f:
+        f.write(data)
+    return dest + ".gz"
+
+
+def resolve(path):
+    # The stored file behind a logical path (plain or .gz), or None
+    for candidate in (path, path + ".gz"):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def open_artifact(path):
+    real = resolve(path)
+    if real is None:
+        raise FileNotFoundError(path)
+    return gzip.open(real, "rb") if real.endswith(".gz") else open(real, "rb")
+
+
+def read_bytes(path):
+    with open_artifact(path) as f:
+        return f.read()
+
+
+def compact(version_dir):
+    # Compress raw files left uncompressed by older versions of the pipeline
+    saved = 0
+    for path in [os.path.join(version_dir, "report.json"), os.path.join(version_dir, "report.html"),
+                 *glob.glob(os.path.join(version_dir, "runs", "*.json"))]:
+        if os.path.exists(path) and not os.path.exists(path + ".gz"):
+            before = os.path.getsize(path)
+            saved += before - os.path.getsize(store(path, path))
+    return saved
+
+
+def _remove_raw(version_dir):
+    freed = 0
+    for name in RAW_PATTERNS:
+        path = os.path.join(version_dir, name)
+        if os.path.isdir(path):
+            freed += sum(os.path.getsize(p) for p in glob.glob(os.path.join(path, "*")))
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            freed += os.path.getsize(path)
+            os.remove(path)
+    return freed
+
+
+def apply_retention(artifacts_dir=report_catalog.ARTIFACTS_DIR, days=RETENTION_DAYS, mode=RETENTION_MODE, dry_run=False):
+    # prune: drop raw files from every audit older than `days`.
+    # downsample: same, but keep raw files for the newest audit per site per week.
+    reports = report_catalog.load_reports(artifacts_dir)
+    reports["ts"] = pd.to_datetime(reports["timestamp"], format="%Y-%m-%d_%H-%M-%S", errors="coerce")
+    old = reports[reports["ts"] < datetime.now() - timedelta(days=days)]
+
+    doomed = old
+    if mode == "downsample" and not old.empty:
+        keep = old.assign(week=old["ts"].dt.strftime("%G-%V")).sort_values("ts") \
+            .drop_duplicates(["site", "week"], keep="last").index
+        doomed = old.drop(keep)
+
+    summary = {"pruned_folders": 0, "freed_bytes": 0, "compacted_bytes": 0, "legacy_files": 0, "job_files": 0}
+    for folder in doomed["folder"].unique():
+        version_dir = os.path.join(artifacts_dir, folder)
+        if folder == "." or not any(os.path.exists(os.path.join(version_dir, n)) for n in RAW_PATTERNS):
+            continue
+        summary["pruned_folders"] += 1
+        if not dry_run:
+            summary["freed_bytes"] += _remove_raw(version_dir)
+
+    if not dry_run:
+        for folder in reports["folder"].unique():
+            if folder != ".":
+                summary["compacted_bytes"] += compact(os.path.join(artifacts_dir, folder))
+
+    # Root-level duplicates written by earlier versions (lighthouse_<ts>_<serial>.html are never
+    # referenced; artifacts/report.json still backs a report when the catalog has a "." row)
+    legacy = glob.glob(os.path.join(artifacts_dir, "lighthouse_*.html"))
+    if not (reports["folder"] == ".").any():
+        legacy.append(os.path.join(artifacts_dir, "report.json"))
+    for path in legacy:
+        if os.path.exists(path):
+            summary["legacy_files"] += 1
+            if not dry_run:
+                summary["freed_bytes"] += os.path.getsize(path)
+                os.remove(path)
+
+    # State and logs of background jobs that finished before the cutoff
+    job_files, job_bytes = job_runner.prune_jobs(os.path.join(artifacts_dir, ".jobs"), days, dry_run)
+    summary["job_files"] += job_files
+    if not dry_run:
+        summary["freed_bytes"] += job_bytes
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Compress raw Lighthouse artifacts and apply the retention policy.")
+    parser.add_argument("--artifacts-dir", default=report_catalog.ARTIFACTS_DIR)
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS, help="keep raw artifacts newer than this")
+    parser.add_argument("--mode", choices=["prune", "downsample"], default=RETENTION_MODE)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    result = apply_retention(args.artifacts_dir, args.days, args.mode, args.dry_run)
+    print(f"{'🔎 Would prune' if args.dry_run else '🧹 Pruned'} raw artifacts in {result['pruned_folders']} folders, "
+          f"{result['legacy_files']} legacy root files, {result['job_files']} old job files; freed {result['freed_bytes'] / 1e6:.1f} MB, "
+          f"compression saved {result['compacted_bytes'] / 1e6:.1f} MB")
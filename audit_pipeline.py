@@ -0,0 +1,309 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from urllib.parse import urlparse
+
+import analyze_ux
+import artifact_store
+import heuristic_review
+import lighthouse_cache
+import lighthouse_parser
+import preflight
+import stage_timing
+from component_checker import inspect_page
+from job_runner import file_slot
+
+# Audit stages shared by the dashboard's single-URL and batch modes and the ux_audit CLI.
+# Nothing in here touches Streamlit: failures are raised as RuntimeError.
+ARTIFACTS_DIR = "artifacts"
+
+LIGHTHOUSE_FLAGS = [
+    "--output=json", "--output=html",
+    "--quiet",
+    "--throttling-method=devtools",
+    "--chrome-flags=--headless --no-sandbox --disable-gpu --disable-dev-shm-usage",
+]
+
+# Max Lighthouse runs in flight on the host: batch workers, sampled runs and every job
+# process share it through lock files in LIGHTHOUSE_SLOTS_DIR (the semaphore keeps a
+# single process's threads from polling for slots it can't get). Every run launches
+# its own Chrome, and more of them than this contend for CPU and skew devtools-throttled scores.
+SAMPLE_CPU_BUDGET = int(os.environ.get("LIGHTHOUSE_CPU_BUDGET", max(1, (os.cpu_count() or 2) // 2)))
+LIGHTHOUSE_SLOTS_DIR = os.environ.get("LIGHTHOUSE_SLOTS_DIR", os.path.join(tempfile.gettempdir(), "ux-audit-lighthouse"))
+LIGHTHOUSE_SLOT_POLL = 0.5
+_lighthouse_slots = threading.BoundedSemaphore(SAMPLE_CPU_BUDGET)
+
+
+def site_name_for(url):
+    return urlparse(url).netloc.replace(".", "_").replace("www_", "")
+
+
+def create_version_dir(url, artifacts_dir=ARTIFACTS_DIR):
+    site_name = site_name_for(url)
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    serial = uuid.uuid4().hex[:6]
+    base_name = f"{site_name}_{timestamp}_{serial}"
+    version_dir = os.path.join(artifacts_dir, base_name)
+    os.makedirs(version_dir, exist_ok=True)
+    meta = {"site": site_name, "timestamp": timestamp, "serial": serial, "url": url}
+    return version_dir, meta
+
+
+def write_meta(version_dir, meta):
+    with open(os.path.join(version_dir, "report_meta.json"), "w") as f:
+        json.dump(meta, f)
+
+
+def read_meta(version_dir):
+    with open(os.path.join(version_dir, "report_meta.json")) as f:
+        return json.load(f)
+
+
+def url_for(meta):
+    # Audited URL of a report folder; folders from before it was recorded only have the site name
+    return meta.get("url") or f"https://{meta['site'].replace('_', '.')}"
+
+
+def check_url(url, checked=None):
+    # Preflight result for `url` (reusing one from a batch-wide preflight when given)
+    checked = checked or preflight.check(url)
+    if not checked["ok"]:
+        raise RuntimeError(checked["error"])
+    return checked
+
+
+_caches = {}
+_cache_lock = threading.Lock()
+
+
+def get_cache(artifacts_dir=ARTIFACTS_DIR):
+    # One Lighthouse cache per artifacts tree, kept inside that tree
+    with _cache_lock:
+        if artifacts_dir not in _caches:
+            _caches[artifacts_dir] = lighthouse_cache.LighthouseCache(
+                os.path.join(artifacts_dir, lighthouse_cache.CACHE_SUBDIR))
+        return _caches[artifacts_dir]
+
+
+def _run_measured(cmd):
+    # subprocess.run, but reaped with os.wait4 so the rusage of this one process (and the
+    # children it waited for, i.e. Lighthouse's Chrome) is known; None where wait4 is missing
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=stderr)
+        usage = None
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+        else:
+            proc.wait()
+        stderr.seek(0)
+        return proc.returncode, stderr.read().decode("utf-8", "replace"), usage
+
+
+def _lighthouse(url, output_prefix, record=None):
+    with _lighthouse_slots, file_slot(LIGHTHOUSE_SLOTS_DIR, SAMPLE_CPU_BUDGET, LIGHTHOUSE_SLOT_POLL):
+        returncode, stderr, usage = _run_measured(
+            ["lighthouse", url, f"--output-path={output_prefix}", *LIGHTHOUSE_FLAGS])
+    stage_timing.add_child_usage(record, usage)
+    if returncode:
+        raise RuntimeError(f"Lighthouse failed: {stderr or f'exit status {returncode}'}")
+
+
+def run_samples(url, output_prefix, runs, record=None):
+    # N runs in parallel (as far as the shared Lighthouse slots allow); raw run reports go to
+    # runs/run_<i>.json for analyze_ux to aggregate, and the median-performance run becomes
+    # the folder's report.json/html
+    prefixes = [f"{output_prefix}.run{i}" for i in range(runs)]
+    with ThreadPoolExecutor(max_workers=max(1, min(runs, SAMPLE_CPU_BUDGET))) as pool:
+        futures = [pool.submit(_lighthouse, url, prefix, record) for prefix in prefixes]
+    errors = [f.exception() for f in futures if f.exception()]
+    completed = [p for p, f in zip(prefixes, futures) if not f.exception()]
+    if not completed:
+        raise errors[0]
+
+    scores = [lighthouse_parser.parse(f"{p}.report.json")["categories"].get("performance", {}).get("score") or 0
+              for p in completed]
+    median = sorted(range(len(completed)), key=scores.__getitem__)[len(completed) // 2]
+
+    runs_dir = os.path.join(os.path.dirname(output_prefix), "runs")
+    os.makedirs(runs_dir, exist_ok=True)
+    for i, prefix in enumerate(completed):
+        if i == median:
+            shutil.copy(f"{prefix}.report.json", f"{output_prefix}.report.json")
+            shutil.move(f"{prefix}.report.html", f"{output_prefix}.report.html")
+        else:
+            os.remove(f"{prefix}.report.html")
+        artifact_store.store(f"{prefix}.report.json", os.path.join(runs_dir, f"run_{i}.json"))
+    return len(completed)
+
+
+def run_lighthouse(url, output_prefix, use_cache=False, headers=None, runs=1, artifacts_dir=ARTIFACTS_DIR,
+                   record=None):
+    # Returns True when the result was served from the Lighthouse cache.
+    # Sampled (runs > 1) audits always run fresh: the cache holds single runs only.
+    # `record` (a stage_timing record) receives the Lighthouse processes' CPU and RSS.
+    if runs > 1:
+        run_samples(url, output_prefix, runs, record)
+        return False
+
+    json_report, html_report = f"{output_prefix}.report.json", f"{output_prefix}.report.html"
+    key = None
+    if use_cache:
+        try:
+            key = lighthouse_cache.cache_key(url, LIGHTHOUSE_FLAGS, lighthouse_cache.fingerprint(url, headers))
+            if get_cache(artifacts_dir).get(key, json_report, html_report):
+                return True
+        except Exception:
+            key = None  # no fingerprint: fall through to a normal run
+
+    _lighthouse(url, output_prefix, record)
+
+    if key:
+        get_cache(artifacts_dir).put(key, json_report, html_report, url)
+    return False
+
+
+def store_report(json_path, html_path, version_dir):
+    # Final (compressed) home of the Lighthouse output inside the versioned directory
+    artifact_store.store(json_path, os.path.join(version_dir, "report.json"))
+    artifact_store.store(html_path, os.path.join(version_dir, "report.html"))
+
+
+def run_analysis(version_dir, timer=None, artifacts_dir=ARTIFACTS_DIR):
+    try:
+        return analyze_ux.analyze(version_dir, timer, artifacts_dir)
+    except Exception as e:
+        raise RuntimeError(f"analyze_ux failed: {e}")
+
+
+def run_heuristics(url, version_dir, page_facts=None):
+    try:
+        return heuristic_review.review(url, version_dir, page_facts)
+    except Exception as e:
+        raise RuntimeError(f"heuristic_review failed: {e}")
+
+
+def import_report(data, raw, artifacts_dir=ARTIFACTS_DIR):
+    # Store an uploaded Lighthouse report as a new versioned audit and analyze it
+    url = data.get("finalUrl") or data.get("requestedUrl") or ""
+    version_dir, meta = create_version_dir(url, artifacts_dir)
+    write_meta(version_dir, meta)
+    artifact_store.write_bytes(os.path.join(version_dir, "report.json"), raw)
+    return run_analysis(version_dir, artifacts_dir=artifacts_dir)
+
+
+def save_components(version_dir, components):
+    with open(os.path.join(version_dir, "components.json"), "w") as f:
+        json.dump(components, f)
+
+
+def run_components(url, version_dir, timer=None, page_facts=True):
+    # Returns (components, page facts or None). With `page_facts` the same load also collects
+    # the heuristic review's page facts, so audits load the page only once.
+    scripts = [heuristic_review.PAGE_FACTS_SCRIPT] if page_facts else []
+    components, extras = asyncio.run(inspect_page(url, scripts, timer=timer))
+    save_components(version_dir, components)
+    return components, (extras[0] if extras else None)
+
+
+def run_audit(url, artifacts_dir=ARTIFACTS_DIR, on_stage=None, use_cache=lighthouse_cache.ENABLED, runs=1, checked=None):
+    # Full non-interactive audit of one URL; returns a summary dict instead of raising.
+    # Every stage is timed into <version_dir>/timings.jsonl.
+    timer = stage_timing.StageTimer(url=url)
+
+    def stage(name, cpu=True):
+        if on_stage:
+            on_stage(url, name)
+        return timer.stage(name, cpu)
+
+    started = time.time()
+    result = {"URL": url, "Status": "❌", "Folder": None, "Seconds": None, "Cached": False, "Error": ""}
+    try:
+        with stage("preflight"):
+            checked = check_url(url, checked)
+        # Later stages audit the post-redirect URL the preflight resolved
+        target = checked["final_url"]
+
+        version_dir, meta = create_version_dir(url, artifacts_dir)
+        meta["preflight"] = {k: checked[k] for k in ("final_url", "status", "method", "redirects", "elapsed_ms")}
+        result["Folder"] = version_dir
+        write_meta(version_dir, meta)
+        output_prefix = os.path.join(version_dir, os.path.basename(version_dir))
+
+        page_facts = None
+        try:
+            with stage("components", cpu=False):
+                _, page_facts = run_components(target, version_dir, timer)
+        except Exception as e:
+            result["Error"] = f"Component check skipped: {e}"
+
+        with stage("lighthouse") as record:
+            result["Cached"] = run_lighthouse(target, output_prefix, use_cache, checked["headers"], runs, artifacts_dir,
+                                              record)
+        with stage("store"):
+            store_report(f"{output_prefix}.report.json", f"{output_prefix}.report.html", version_dir)
+
+        with stage("analysis"):
+            run_analysis(version_dir, timer, artifacts_dir)
+
+        try:
+            with stage("heuristics", cpu=False):
+                run_heuristics(target, version_dir, page_facts)
+        except RuntimeError as e:
+            result["Error"] = str(e)
+
+        result["Status"] = "✅"
+    except Exception as e:
+        result["Error"] = str(e)
+    result["Seconds"] = round(time.time() - started, 1)
+    if result["Folder"]:
+        try:
+            timer.write(result["Folder"])
+        except OSError:
+            pass
+    if on_stage:
+        on_stage(url, "done" if result["Status"] == "✅" else "failed")
+    return result
+
+
+def parse_url_list(text, csv_text=""):
+    # One URL per line in `text` (commas are part of the URL); the first column of each
+    # row in `csv_text`. Blanks, comments and duplicates dropped.
+    values = text.splitlines() + [row[0] for row in csv.reader(io.StringIO(csv_text)) if row]
+    urls = []
+    for value in (v.strip() for v in values):
+        if value and not value.startswith("#") and value not in urls and urlparse(value).scheme in ("http", "https"):
+            urls.append(value)
+    return urls
+
+
+def run_batch(urls, workers=4, artifacts_dir=ARTIFACTS_DIR, on_stage=None, poll=None, use_cache=lighthouse_cache.ENABLED,
+              runs=1):
+    # Yields each audit result as it finishes; with `poll` set, also yields None
+    # every `poll` seconds so callers can refresh progress while audits run.
+    # All URLs are preflighted together up front, before any Lighthouse run starts.
+    for url in urls:
+        if on_stage:
+            on_stage(url, "preflight")
+    try:
+        checked = preflight.run(urls)
+    except Exception:
+        checked = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {pool.submit(run_audit, url, artifacts_dir, on_stage, use_cache, runs, checked.get(url)) for url in urls}
+        while pending:
+            done, pending = wait(pending, timeout=poll, return_when=FIRST_COMPLETED)
+            if not done:
+                yield None
+            for future in done:
+                yield future.result()
@@ -0,0 +1,329 @@
+import argparse
+import asyncio
+import base64
+import functools
+import http.server
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Offline benchmark suite for the analysis and dashboard data paths. Everything runs
+# against synthetic data in a scratch directory: Lighthouse reports at realistic
+# sizes, artifacts/ trees with thousands of report folders and a local static site
+# for the component checker. Results are JSON so runs can be diffed across commits:
+#
+#   python benchmark.py --folders 1000 10000 --output bench_$(git rev-parse --short HEAD).json
+#   python benchmark.py --baseline bench_abc123.json
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+SITES = 50
+AUDIT_IDS = {
+    "first-contentful-paint": (800, 4000),
+    "largest-contentful-paint": (1200, 8000),
+    "total-blocking-time": (0, 1500),
+    "cumulative-layout-shift": (0, 0.5),
+    "speed-index": (1000, 9000),
+    "interactive": (1500, 12000),
+    "dom-size": (300, 4000),
+}
+VIOLATIONS = [f"Synthetic violation {i}" for i in range(40)]
+
+
+# === Synthetic data ===
+
+def synthetic_report(rng, url="https://example.com/", size_mb=2.0, audits=180):
+    # Same shape as Lighthouse output: most of the bytes sit in audit details and screenshots
+    report = {
+        "lighthouseVersion": "11.4.0",
+        "requestedUrl": url,
+        "finalUrl": url,
+        "fetchTime": datetime.now().isoformat(),
+        "categories": {cat: {"id": cat, "title": cat.title(), "score": round(rng.uniform(0.3, 1.0), 2),
+                             "auditRefs": [{"id": f"audit-{i}", "weight": 1} for i in range(audits // 4)]}
+                       for cat in ("performance", "accessibility", "seo", "best-practices")},
+        "audits": {},
+        "i18n": {"rendererFormattedStrings": {f"s{i}": "x" * 40 for i in range(200)}},
+    }
+    for audit_id, (low, high) in AUDIT_IDS.items():
+        value = rng.uniform(low, high)
+        report["audits"][audit_id] = {"id": audit_id, "title": audit_id.replace("-", " ").title(),
+                                      "score": round(rng.random(), 2), "numericValue": value,
+                                      "displayValue": f"{value:.0f}"}
+    budget = int(size_mb * 1e6 * 0.6 / audits)
+    for i in range(audits):
+        items = [{"url": f"{url}asset/{i}/{j}.js", "wastedBytes": rng.randint(0, 90000),
+                  "totalBytes": rng.randint(1000, 200000), "node": {"snippet": "<div class=\"x\">" * 3}}
+                 for j in range(max(1, budget // 160))]
+        report["audits"][f"audit-{i}"] = {
+            "id": f"audit-{i}", "title": f"Synthetic audit {i}", "description": "lorem ipsum " * 10,
+            "score": rng.choice([0, 0.5, 1, None]), "scoreDisplayMode": "binary",
+            "details": {"type": "table", "headings": [{"key": "url"}], "items": items},
+        }
+    blob = base64.b64encode(rng.randbytes(int(size_mb * 1e6 * 0.3))).decode()
+    report["audits"]["full-page-screenshot"] = {"id": "full-page-screenshot", "title": "Full-page screenshot",
+                                                "score": None, "details": {"type": "full-page-screenshot",
+                                                                           "screenshot": {"data": blob}}}
+    return report
+
+
+def write_report(path, report):
+    with open(path, "w") as f:
+        json.dump(report, f)
+    return os.path.getsize(path)
+
+
+def build_tree(artifacts_dir, folders, rng, sites=SITES):
+    # CSV + JSON summary + report_meta.json per folder, as analyze_ux writes them
+    import analyze_ux
+    os.makedirs(artifacts_dir, exist_ok=True)
+    start = datetime(2024, 1, 1)
+    for n in range(folders):
+        site = f"site{n % sites}_example_com"
+        timestamp = (start + timedelta(minutes=37 * n)).strftime("%Y-%m-%d_%H-%M-%S")
+        serial = f"{n:06x}"
+        version_dir = os.path.join(artifacts_dir, f"{site}_{timestamp}_{serial}")
+        os.makedirs(version_dir, exist_ok=True)
+        with open(os.path.join(version_dir, "report_meta.json"), "w") as f:
+            json.dump({"site": site, "timestamp": timestamp, "serial": serial, "url": f"https://{site}/"}, f)
+        rows = [(f"Score: {cat.title()}", rng.randint(30, 100)) for cat in analyze_ux.CATEGORIES]
+        rows += [(label, round(rng.uniform(*AUDIT_IDS[key]))) for key, label in analyze_ux.METRICS.items()]
+        base = os.path.join(version_dir, f"ux_report_{site}_{timestamp}_{serial}")
+        with open(base + ".csv", "w") as f:
+            f.write("Metric,Value\n" + "".join(f"{m},{v}\n" for m, v in rows))
+        with open(base + ".json", "w") as f:
+            json.dump({"Core Scores": dict(rows), "Violations": rng.sample(VIOLATIONS, rng.randint(0, 6))}, f)
+
+
+def build_site(root, pages=30):
+    # Static site for the component checker: every page links to a few others
+    os.makedirs(root, exist_ok=True)
+    for i in range(pages):
+        links = "".join(f'<a href="/page{(i * 7 + k) % pages}.html">Page {k}</a>' for k in range(5))
+        body = "".join(f"<p>Paragraph {j} <button>Action {j}</button></p>" for j in range(40))
+        html = (f"<html><body><header><nav>{links}</nav></header><main>{body}"
+                f"<form><input name='q'><button type='submit'>Go</button></form></main>"
+                f"<footer>Footer</footer></body></html>")
+        with open(os.path.join(root, "index.html" if i == 0 else f"page{i}.html"), "w") as f:
+            f.write(html)
+
+
+@functools.lru_cache(maxsize=None)
+def _quiet_handler(directory):
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=directory, **kwargs)
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+def serve(directory):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _quiet_handler(directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+# === Timing ===
+
+def bench(fn, repeat=5, warmup=1):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return {"runs": repeat, "min_s": round(min(times), 5), "median_s": round(statistics.median(times), 5),
+            "max_s": round(max(times), 5)}
+
+
+def skipped(e):
+    return {"skipped": f"{type(e).__name__}: {e}"}
+
+
+# === Benchmarks ===
+
+def bench_extraction(workdir, rng, size_mb, repeat):
+    import analyze_ux
+    import lighthouse_parser
+
+    path = os.path.join(workdir, "report.json")
+    size = write_report(path, synthetic_report(rng, size_mb=size_mb))
+
+    def json_load():
+        with open(path) as f:
+            analyze_ux.extract(json.load(f))
+
+    version_dir = os.path.join("artifacts", "bench_example_com_2024-01-01_00-00-00_000000")
+    os.makedirs(version_dir, exist_ok=True)
+    with open(os.path.join(version_dir, "report_meta.json"), "w") as f:
+        json.dump({"site": "bench_example_com", "timestamp": "2024-01-01_00-00-00", "serial": "000000"}, f)
+    write_report(os.path.join(version_dir, "report.json"), synthetic_report(rng, size_mb=size_mb))
+
+    return {
+        "report_bytes": size,
+        "parse_extract": bench(lambda: analyze_ux.extract(lighthouse_parser.parse(path)), repeat),
+        "json_load_extract": bench(json_load, repeat),
+        "analyze": bench(lambda: analyze_ux.analyze(version_dir), repeat),
+    }
+
+
+def bench_tree(workdir, folders, rng, repeat):
+    import fleet
+    import report_catalog
+
+    artifacts_dir = os.path.join(workdir, f"tree_{folders}")
+    started = time.perf_counter()
+    build_tree(artifacts_dir, folders, rng)
+    result = {"folders": folders, "generate_s": round(time.perf_counter() - started, 3)}
+
+    # Discovery: a cold catalog rebuild is a full rescan, warm loads are catalog queries
+    started = time.perf_counter()
+    report_catalog.rebuild(artifacts_dir)
+    result["discovery_rebuild_s"] = round(time.perf_counter() - started, 3)
+    result["discovery_load_reports"] = bench(lambda: report_catalog.load_reports(artifacts_dir), repeat)
+
+    site = "site0_example_com"
+
+    def trends():
+        df = report_catalog.query_metrics(site, artifacts_dir=artifacts_dir)
+        report_catalog.rolling_median(df[report_catalog.SCORE_COLUMNS], 5)
+        report_catalog.percentiles(df)
+
+    def fleet_overview():
+        frame = fleet.load_frame(artifacts_dir)
+        fleet.latest_per_site(frame)
+        fleet.week_over_week(frame)
+
+    result["trends_site"] = bench(trends, repeat)
+    result["trends_fleet"] = bench(fleet_overview, repeat)
+    result["comparison"] = bench_comparison(report_catalog.load_reports(artifacts_dir), repeat)
+    return result
+
+
+def bench_comparison(reports, repeat):
+    import report_diff
+
+    paths = reports["csv_path"].tolist()
+    half = len(paths) // 2
+    return {
+        "pair": bench(lambda: report_diff.one_to_many(reports, paths[0], paths[1:2]), repeat),
+        "one_vs_all": bench(lambda: report_diff.one_to_many(reports, paths[0], paths[1:]), repeat),
+        "set_vs_set": bench(lambda: report_diff.set_vs_set(reports, paths[:half], paths[half:]), repeat),
+    }
+
+
+def bench_components(workdir, repeat):
+    try:
+        import component_checker
+    except ImportError as e:
+        return skipped(e)
+    site_dir = os.path.join(workdir, "site")
+    build_site(site_dir)
+    server, url = serve(site_dir)
+    try:
+        pool = component_checker.get_pool()
+        check = lambda: asyncio.run(component_checker.check_components(url))
+        crawl = lambda: asyncio.run(component_checker.crawl_components(url, max_depth=2, max_pages=30))
+        return {
+            "check": bench(check, repeat),
+            "crawl_30_pages": bench(crawl, max(1, repeat // 2)),
+            "pool": pool.health_check(),
+        }
+    except Exception as e:
+        return skipped(e)
+    finally:
+        server.shutdown()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def flatten(results, prefix=""):
+    # {"tree_1000.trends_site": median_s, ...} for comparing two result files
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and "median_s" in value:
+            flat[name] = value["median_s"]
+        elif isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif key.endswith("_s") and isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare_results(current, baseline):
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    return {name: {"baseline_s": old[name], "current_s": new[name],
+                   "ratio": round(new[name] / old[name], 3) if old[name] else None}
+            for name in new if name in old}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis and dashboard data paths on synthetic data.")
+    parser.add_argument("--folders", type=int, nargs="+", default=[1000],
+                        help="artifact tree sizes to generate (e.g. 1000 10000 100000)")
+    parser.add_argument("--report-mb", type=float, default=2.0, help="size of synthetic report.json files")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--skip-components", action="store_true")
+    parser.add_argument("--workdir", help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    # Resolve user paths before moving into the scratch directory
+    output_path = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    rng = random.Random(args.seed)
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="ux_bench_"))
+    os.makedirs(workdir, exist_ok=True)
+    # The pipeline writes to ./artifacts; keep that inside the scratch directory
+    os.chdir(workdir)
+
+    results = {"extraction": bench_extraction(workdir, rng, args.report_mb, args.repeat)}
+    for folders in args.folders:
+        results[f"tree_{folders}"] = bench_tree(workdir, folders, rng, args.repeat)
+    if not args.skip_components:
+        results["components"] = bench_components(workdir, args.repeat)
+
+    output = {
+        "commit": git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")} | {"workdir": workdir},
+        "results": results,
+    }
+    if baseline_path:
+        with open(baseline_path) as f:
+            output["comparison"] = compare_results(output, json.load(f))
+
+    text = json.dumps(output, indent=2)
+    if output_path:
+        with open(output_path, "w") as f:
+            f.write(text + "\n")
+        print(f"✅ Saved: {output_path}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
-
 import asyncio
+import atexit
+import json
+import os
+import threading
+from contextlib import asynccontextmanager
+from urllib.parse import urldefrag, urljoin, urlparse
 from playwright.async_api import async_playwright
 
+from stage_timing import timed
+
 # Define which components to check
 CHECK_SELECTORS = [
     "header",
@@ -14,28 +21,320 @@ CHECK_SELECTORS = [
     "form"
 ]
 
-async def check_components(url: str) -> list[dict]:
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
+# Optional per-site overrides, keyed by the same site name used for report folders:
+# {"default": ["header", ...], "sites": {"example_com": ["header", "#checkout", ...]}}
+SELECTORS_FILE = os.environ.get("COMPONENT_SELECTORS_FILE", "component_selectors.json")
+
+# Evaluated once per page: every selector is resolved in a single round-trip
+EVALUATE_SELECTORS_JS = """
+(selectors) => {
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        return rect.width > 0 && rect.height > 0 && style.visibility !== "hidden" && style.display !== "none";
+    };
+    const isEnabled = (el) => !el.disabled && el.getAttribute("aria-disabled") !== "true";
+    const hasName = (el) => Boolean(
+        el.getAttribute("aria-label") || el.getAttribute("aria-labelledby") || el.getAttribute("title") ||
+        el.getAttribute("alt") || el.getAttribute("placeholder") || (el.labels && el.labels.length) ||
+        (el.textContent || "").trim()
+    );
+    return selectors.map((selector) => {
+        let nodes;
+        try {
+            nodes = Array.from(document.querySelectorAll(selector));
+        } catch (e) {
+            return {selector, error: String(e)};
+        }
+        return {
+            selector,
+            count: nodes.length,
+            visible: nodes.filter(isVisible).length,
+            enabled: nodes.filter(isEnabled).length,
+            named: nodes.filter(hasName).length,
+        };
+    });
+}
+"""
+
+LINKS_JS = "() => Array.from(document.querySelectorAll('a[href]'), (a) => a.href)"
+
+# Browser pool tuning
+MAX_PAGES_PER_BROWSER = 50   # recycle Chromium after this many pages to keep memory flat
+MAX_CONCURRENT_PAGES = 4
+
+
+class BrowserPool:
+    # One long-lived Chromium shared by every check. Playwright objects are bound
+    # to the loop that created them, so the pool owns a loop on a daemon thread and
+    # callers on any other loop (or none) hand their coroutines over to it.
+    def __init__(self, max_pages=MAX_PAGES_PER_BROWSER, max_concurrent=MAX_CONCURRENT_PAGES):
+        self.max_pages = max_pages
+        self.max_concurrent = max_concurrent
+        self.pages_served = 0
+        self._playwright = None
+        self._browser = None
+        self._active = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="browser-pool", daemon=True)
+        self._thread.start()
+        self._lock = self.run(self._make(asyncio.Lock))
+        self._slots = self.run(self._make(asyncio.Semaphore, max_concurrent))
+
+    @staticmethod
+    async def _make(factory, *args):
+        return factory(*args)
+
+    def run(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    async def submit(self, coro):
+        # Await a coroutine on the pool loop from any other event loop
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    async def _acquire_browser(self):
+        async with self._lock:
+            if self._browser and (not self._browser.is_connected() or self.pages_served >= self.max_pages):
+                await self._retire(self._browser)
+                self._browser = None
+            if self._browser is None:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True)
+                self._active[self._browser] = 0
+                self.pages_served = 0
+            self.pages_served += 1
+            self._active[self._browser] += 1
+            return self._browser
+
+    async def _release_browser(self, browser):
+        async with self._lock:
+            self._active[browser] -= 1
+            if browser is not self._browser:
+                await self._retire(browser)
+
+    async def _retire(self, browser):
+        # Close a recycled browser once its last page is done
+        if self._active.get(browser, 0) > 0:
+            return
+        self._active.pop(browser, None)
         try:
-            await page.goto(url, timeout=10000)
+            await browser.close()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def page(self):
+        # Must be used on the pool loop; each page gets its own isolated context
+        async with self._slots:
+            browser = await self._acquire_browser()
+            try:
+                context = await browser.new_context()
+                try:
+                    yield await context.new_page()
+                finally:
+                    await context.close()
+            finally:
+                await self._release_browser(browser)
+
+    @asynccontextmanager
+    async def context(self):
+        # One shared context for callers that drive several pages at once (crawls)
+        async with self._slots:
+            browser = await self._acquire_browser()
+            try:
+                context = await browser.new_context()
+                try:
+                    yield context
+                finally:
+                    await context.close()
+            finally:
+                await self._release_browser(browser)
+
+    def count_page(self, browser):
+        # Pages loaded in a reused page (crawls) count toward recycling like page() does;
+        # False once `browser` is due to be recycled
+        if browser is self._browser:
+            self.pages_served += 1
+        return not self.recycle_due(browser)
+
+    def recycle_due(self, browser):
+        return browser is not self._browser or self.pages_served >= self.max_pages
+
+    def health_check(self):
+        return {
+            "alive": self._thread.is_alive(),
+            "connected": bool(self._browser and self._browser.is_connected()),
+            "pages_served": self.pages_served,
+            "max_pages": self.max_pages,
+        }
+
+    async def _shutdown(self):
+        for browser in list(self._active):
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        self._active.clear()
+        self._browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def close(self):
+        if self._thread.is_alive():
+            self.run(self._shutdown(), timeout=30)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_pool = None
+_pool_lock = threading.Lock()
 
-            results = []
-            for selector in CHECK_SELECTORS:
+
+def get_pool() -> BrowserPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None or not _pool.health_check()["alive"]:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
+
+
+def selectors_for(url: str) -> list[str]:
+    if not os.path.exists(SELECTORS_FILE):
+        return CHECK_SELECTORS
+    with open(SELECTORS_FILE) as f:
+        config = json.load(f)
+    site = urlparse(url).netloc.replace(".", "_").replace("www_", "")
+    return config.get("sites", {}).get(site) or config.get("default") or CHECK_SELECTORS
+
+
+async def evaluate_selectors(page, selectors: list[str]) -> list[dict]:
+    results = []
+    for item in await page.evaluate(EVALUATE_SELECTORS_JS, selectors):
+        item["status"] = "✅" if item.get("count") and not item.get("error") else "❌"
+        results.append(item)
+    return results
+
+
+async def _check(pool: BrowserPool, url: str, selectors: list[str], timer=None, scripts=()):
+    # (components, [result of each (js, arg) in `scripts`, None where it failed]) from one page load
+    async with pool.page() as page:
+        with timed(timer, "components.load", cpu=False):
+            await page.goto(url, timeout=10000)
+        with timed(timer, "components.evaluate", cpu=False):
+            components = await evaluate_selectors(page, selectors)
+            extras = []
+            for js, arg in scripts:
                 try:
-                    found = await page.query_selector(selector)
-                    status = "✅" if found else "❌"
+                    extras.append(await page.evaluate(js, arg))
                 except Exception:
-                    status = "❌"
-                results.append({
-                    "selector": selector,
-                    "status": status
-                })
+                    extras.append(None)
+            return components, extras
 
-            await browser.close()
-            return results
 
-        except Exception as e:
-            await browser.close()
-            raise RuntimeError(f"Component check failed: {e}")
\ No newline at end of file
+async def _fresh_check(url, selectors, timer=None, scripts=()):
+    pool = get_pool()
+    try:
+        return await pool.submit(_check(pool, url, selectors, timer, scripts))
+    except Exception as e:
+        raise RuntimeError(f"Component check failed: {e}")
+
+
+async def check_components(url: str, selectors: list[str] = None, timer=None) -> list[dict]:
+    return (await _fresh_check(url, selectors or selectors_for(url), timer))[0]
+
+
+async def inspect_page(url: str, scripts, selectors: list[str] = None, timer=None):
+    # A component check that also evaluates every (js, arg) in `scripts` on the same
+    # page load, so other reviews of the page need no load of their own
+    return await _fresh_check(url, selectors or selectors_for(url), timer, scripts)
+
+
+async def _crawl(pool, start_url, selectors, max_depth, max_pages, concurrency, on_result):
+    origin = urlparse(start_url).netloc
+    start_url = urldefrag(start_url)[0]
+    seen = {start_url}
+    queue = asyncio.Queue()
+    queue.put_nowait((start_url, 0))
+    results = []
+    waiting = set()
+
+    async def worker(context):
+        nonlocal origin
+        page = await context.new_page()
+        try:
+            while True:
+                waiting.add(asyncio.current_task())
+                try:
+                    url, depth = await queue.get()
+                finally:
+                    waiting.discard(asyncio.current_task())
+                fresh = pool.count_page(context.browser)
+                record = {"url": url, "depth": depth}
+                try:
+                    await page.goto(url, timeout=10000)
+                    if depth == 0:
+                        # Follow the start page's redirects (example.com -> www.example.com)
+                        final = urldefrag(page.url)[0]
+                        origin = urlparse(final).netloc
+                        seen.add(final)
+                    record["components"] = await evaluate_selectors(page, selectors)
+                    if depth < max_depth:
+                        for href in await page.evaluate(LINKS_JS):
+                            link = urldefrag(urljoin(url, href))[0]
+                            parsed = urlparse(link)
+                            if parsed.scheme in ("http", "https") and parsed.netloc == origin \
+                                    and link not in seen and len(seen) < max_pages:
+                                seen.add(link)
+                                queue.put_nowait((link, depth + 1))
+                except Exception as e:
+                    record["error"] = str(e)
+                results.append(record)
+                try:
+                    if on_result:
+                        on_result(record)
+                finally:
+                    queue.task_done()
+                if not fresh:
+                    return
+        finally:
+            await page.close()
+
+    async def run_context(context, done):
+        # Runs workers until the queue is drained or the browser is due for recycling
+        # (busy workers finish their page, idle ones are cancelled without taking one).
+        # A worker that dies outside its per-URL try fails the crawl instead of hanging it.
+        workers = {asyncio.create_task(worker(context)) for _ in range(max(1, concurrency))}
+        try:
+            while workers and not done.done():
+                finished, _ = await asyncio.wait(workers | {done}, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished - {done}:
+                    task.result()
+                workers -= finished
+                if pool.recycle_due(context.browser) and workers <= waiting:
+                    break
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    done = asyncio.ensure_future(queue.join())
+    try:
+        while not done.done():
+            async with pool.context() as context:
+                await run_context(context, done)
+    finally:
+        done.cancel()
+    return results
+
+
+async def crawl_components(start_url: str, max_depth: int = 2, max_pages: int = 100, concurrency: int = 8,
+                           selectors: list[str] = None, on_result=None) -> list[dict]:
+    # Breadth-first same-origin crawl with `concurrency` pages sharing one browser context;
+    # every page counts toward MAX_PAGES_PER_BROWSER and the context moves to a fresh browser
+    # when the current one is recycled.
+    # `on_result` is called for every page as soon as it is checked (on the pool thread).
+    pool = get_pool()
+    selectors = selectors or selectors_for(start_url)
+    return await pool.submit(_crawl(pool, start_url, selectors, max_depth, max_pages, concurrency, on_result))
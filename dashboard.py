@@ -1,18 +1,21 @@
-import shutil
 import streamlit as st
 import pandas as pd
-import glob
 import json
 import os
-import subprocess
-from weasyprint import HTML
-import matplotlib.pyplot as plt
-from datetime import datetime
+import hashlib
+import time
 from urllib.parse import urlparse
-import uuid
-import requests
-import asyncio
-from component_checker import check_components
+import artifact_store
+import audit_pipeline
+import fleet
+import job_runner
+import lighthouse_cache
+import lighthouse_parser
+import report_catalog
+import report_diff
+import report_export
+import report_loader
+import stage_timing
 
 ARTIFACTS_DIR = "artifacts"
 os.makedirs(ARTIFACTS_DIR, exist_ok=True)
@@ -38,150 +41,155 @@ def format_percent_change(old, new):
     if pd.isnull(old) or old == 0: return ""
     return f"{((new - old) / old) * 100:+.1f}%"
 
-def move_and_copy_report(json_path, html_path, version_dir, timestamp, serial):
-    try:
-        # Define final filenames inside versioned directory
-        report_json_dest = os.path.join(version_dir, "report.json")
-        report_html_dest = os.path.join(version_dir, "report.html")
-
-        # Move Lighthouse output files
-        shutil.move(json_path, report_json_dest)
-        shutil.move(html_report, report_html_dest)
-
-        # Copy standard versions to artifacts root
-        shutil.copy(report_json_dest, os.path.join(ARTIFACTS_DIR, "report.json"))
-        shutil.copy(report_html_dest, os.path.join(ARTIFACTS_DIR, f"lighthouse_{timestamp}_{serial}.html"))
-
-        return True
-    except Exception as e:
-        st.error(f"❌ File move/copy failed: {e}")
-        return False
-
 # === Lighthouse Audit ===
+# Audits run as background jobs (job_runner.py) so they survive reruns and refreshes
 with st.sidebar.expander("🌐 Run Lighthouse Audit from URL"):
     url = st.text_input("Paste site URL (e.g. https://example.com)")
+    use_cache = st.checkbox("♻️ Reuse cached result if page is unchanged", value=lighthouse_cache.ENABLED, key="lh_cache")
+    runs = st.number_input("Lighthouse runs (median of N)", 1, 9, 1, key="lh_runs")
     if st.button("🚀 Run Lighthouse"):
         parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or not parsed.netloc:
+            st.error("❌ Enter a full http(s) URL")
+            st.stop()
         if parsed.hostname and any(parsed.hostname.startswith(p) for p in ["localhost", "127.", "192.168"]):
             st.warning("⚠️ Local audits may have limited results")
 
-        site_name = parsed.netloc.replace(".", "_").replace("www_", "")
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        serial = uuid.uuid4().hex[:6]
-        base_name = f"{site_name}_{timestamp}_{serial}"
-        version_dir = os.path.join(ARTIFACTS_DIR, base_name)
-        os.makedirs(version_dir, exist_ok=True)
-
-        output_prefix = os.path.join(version_dir, base_name)
-        json_report = f"{output_prefix}.report.json"
-        html_report = f"{output_prefix}.report.html"
-
-        try:
-            resp = requests.head(url, allow_redirects=True, timeout=5)
-            if resp.status_code >= 400:
-                st.error(f"❌ URL responded with status {resp.status_code}")
-                st.stop()
-        except Exception as e:
-            st.error(f"❌ Failed to connect: {e}")
-            st.stop()
-
-        st.info("🔍 Running component functionality check...")
-        try:
-            components = asyncio.run(check_components(url))
-            failed = [c for c in components if c['status'] != '✅']
-            if failed:
-                st.warning("⚠️ Some key components may be missing or not functional:")
-                for comp in failed:
-                    st.markdown(f"- `{comp['selector']}` → {comp['status']}")
-                if st.button("🚫 Stop Audit Due to Component Issues"): st.stop()
-        except Exception as e:
-            st.error(f"❌ Component check failed: {e}")
-            if not st.button("❌ Skip Component Check and Proceed"): st.stop()
-
-        with open(os.path.join(version_dir, "report_meta.json"), "w") as f:
-            json.dump({"site": site_name, "timestamp": timestamp, "serial": serial}, f)
-
-        try:
-            subprocess.run([
-                "lighthouse", url,
-                "--output=json", "--output=html",
-                f"--output-path={output_prefix}",
-                "--quiet",
-                "--throttling-method=devtools",
-                "--chrome-flags=--headless --no-sandbox --disable-gpu --disable-dev-shm-usage"
-            ], check=True)
-        except subprocess.CalledProcessError as e:
-            st.error("❌ Lighthouse failed")
-            st.code(str(e))
+        job_id = job_runner.submit([url], workers=1, runs=int(runs), use_cache=use_cache)
+        st.success(f"✅ Audit queued as job `{job_id}` — see 🛠️ Audit Jobs")
+
+# === Batch Audit ===
+with st.sidebar.expander("📦 Batch Audit from URL list"):
+    url_text = st.text_area("One URL per line")
+    url_file = st.file_uploader("...or upload a URL list", type=["txt", "csv"], key="batch_urls")
+    workers = st.slider("Parallel workers", 1, 16, 4)
+    batch_cache = st.checkbox("♻️ Reuse cached results for unchanged pages", value=lighthouse_cache.ENABLED, key="batch_cache")
+    batch_runs = st.number_input("Lighthouse runs per URL (median of N)", 1, 9, 1, key="batch_runs")
+    if st.button("🚀 Run Batch"):
+        file_text = url_file.getvalue().decode("utf-8", "ignore") if url_file else ""
+        if url_file and url_file.name.lower().endswith(".csv"):
+            batch_urls = audit_pipeline.parse_url_list(url_text, file_text)
+        else:
+            batch_urls = audit_pipeline.parse_url_list(url_text + "\n" + file_text)
+        if not batch_urls:
+            st.error("❌ No valid http(s) URLs found.")
             st.stop()
 
-        if not move_and_copy_report(json_report, html_report, version_dir, timestamp, serial): st.stop()
-
-        try:
-            subprocess.run(["python", "analyze_ux.py", version_dir], check=True)
-        except subprocess.CalledProcessError as e:
-            st.error("❌ analyze_ux.py failed")
-            st.code(str(e))
-            
-        # Run heuristic review script
-        try:
-            subprocess.run(["python", "heuristic_review.py", url, version_dir], check=True)
-        except subprocess.CalledProcessError as e:
-            st.warning("⚠️ Heuristic review failed.")
-            st.code(str(e))
-
-        try:
-            components = asyncio.run(check_components(url))
-            with open(os.path.join(version_dir, "components.json"), "w") as f:
-                json.dump(components, f)
-        except Exception as e:
-            st.warning(f"⚠️ Component check skipped: {e}")
-
-        st.success("✅ Audit complete")
-        html_report_path = os.path.join(version_dir, "report.html")
-        st.download_button("📄 Download Lighthouse HTML", open(html_report_path, "rb"), file_name=os.path.basename(html_report_path), mime="text/html")
-        st.info(f"👆 Downloaded to: `{html_report_path}`. Open manually in browser.")
+        job_id = job_runner.submit(batch_urls, workers=workers, runs=int(batch_runs), use_cache=batch_cache)
+        st.success(f"✅ {len(batch_urls)} audits queued as job `{job_id}` — see 🛠️ Audit Jobs")
+
+# === Audit Jobs ===
+def render_jobs():
+    jobs = job_runner.list_jobs()
+    if not jobs:
+        st.caption("No audit jobs yet.")
+        return
+    for job in jobs:
+        done, total = len(job["results"]), len(job["urls"])
+        failed = sum(1 for r in job["results"] if r["Status"] != "✅")
+        badge = {"queued": "⏳", "running": "🔄", "done": "✅", "failed": "❌", "interrupted": "⚠️"}.get(job["status"], "❔")
+        elapsed = (job["finished"] or time.time()) - (job["started"] or job["created"])
+        rate = f" · {done / elapsed * 60:.1f} pages/min" if done and elapsed > 0 else ""
+        st.markdown(f"{badge} **{job['id']}** · {job['status']} · {done}/{total} done, {failed} failed{rate}")
+        if job["status"] in ("queued", "running"):
+            st.progress(done / total if total else 0.0)
+            st.dataframe(pd.DataFrame(job["stages"].items(), columns=["URL", "Stage"]), use_container_width=True)
+        elif job["results"]:
+            with st.expander(f"Results for {job['id']}"):
+                st.dataframe(pd.DataFrame(job["results"]), use_container_width=True)
+
+# Poll job files on a timer without rerunning the whole page (when this Streamlit has fragments)
+if hasattr(st, "fragment"):
+    render_jobs = st.fragment(run_every=3)(render_jobs)
+
+with st.expander("🛠️ Audit Jobs", expanded=True):
+    st.button("🔄 Refresh", key="refresh_jobs")
+    render_jobs()
 
 # === Upload Existing Report ===
 with st.sidebar.expander("📥 Upload Lighthouse report"):
     uploaded = st.file_uploader("Upload report.json", type="json")
     if uploaded:
         try:
-            data = json.load(uploaded)
-            if not all(k in data for k in ("audits", "categories", "finalUrl")):
-                st.error("❌ Invalid Lighthouse report structure.")
-                st.stop()
-            with open(os.path.join(ARTIFACTS_DIR, "report.json"), "w") as f:
-                json.dump(data, f, indent=2)
-            subprocess.run(["python", "analyze_ux.py"], check=True)
+            raw = uploaded.getvalue()
+            # The uploader keeps its file across reruns; only import each upload once
+            upload_id = hashlib.sha1(raw).hexdigest()
+            imported = st.session_state.setdefault("imported_uploads", set())
+            if upload_id not in imported:
+                data = lighthouse_parser.parse_bytes(raw)
+                if not (data["audits"] and data["categories"] and "finalUrl" in data):
+                    st.error("❌ Invalid Lighthouse report structure.")
+                    st.stop()
+                audit_pipeline.import_report(data, raw, ARTIFACTS_DIR)
+                imported.add(upload_id)
             st.success("✅ Uploaded and analyzed.")
         except Exception as e:
             st.error(f"❌ Upload failed: {e}")
 
+# === Storage ===
+with st.sidebar.expander("🧹 Storage & Retention"):
+    st.caption(f"Raw Lighthouse files are gzip-compressed. Audits older than {artifact_store.RETENTION_DAYS} days "
+               f"keep only their extracted metrics ({artifact_store.RETENTION_MODE} mode).")
+    if st.button("🔎 Preview retention"):
+        st.json(artifact_store.apply_retention(ARTIFACTS_DIR, dry_run=True))
+    if st.button("🧹 Apply retention now"):
+        result = artifact_store.apply_retention(ARTIFACTS_DIR)
+        st.success(f"✅ Freed {result['freed_bytes'] / 1e6:.1f} MB from {result['pruned_folders']} folders")
+
 # === Load Reports ===
-csv_reports = sorted(glob.glob(os.path.join(ARTIFACTS_DIR, "**", "ux_report_*.csv"), recursive=True))
-if not csv_reports:
+# Catalog queries are cached and keyed on the catalog's version, so they are
+# recomputed only after a new report has been written
+@st.cache_data(show_spinner=False)
+def cached_reports(version):
+    return report_catalog.load_reports(ARTIFACTS_DIR)
+
+@st.cache_data(show_spinner=False)
+def cached_site_metrics(site, start, end, version):
+    return report_catalog.query_metrics(site, start, end, ARTIFACTS_DIR)
+
+@st.cache_data(show_spinner=False)
+def cached_fleet(version):
+    frame = fleet.load_frame(ARTIFACTS_DIR)
+    return fleet.latest_per_site(frame), fleet.week_over_week(frame)
+
+# Timings land after the catalog write, so these are refreshed on a short TTL instead
+@st.cache_data(show_spinner=False, ttl=60)
+def cached_timings(limit):
+    return stage_timing.load_recent(ARTIFACTS_DIR, limit)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_comparison_chart(compare):
+    return report_export.render_comparison_chart(compare)
+
+with st.sidebar:
+    if st.button("🔄 Rescan artifacts"):
+        report_catalog.rebuild(ARTIFACTS_DIR)
+
+reports = cached_reports(report_catalog.catalog_version(ARTIFACTS_DIR))
+if reports.empty and report_catalog.rebuild(ARTIFACTS_DIR):
+    reports = cached_reports(report_catalog.catalog_version(ARTIFACTS_DIR))
+if reports.empty:
     st.warning("❌ No UX reports found.")
     st.stop()
+csv_reports = reports["csv_path"].tolist()
 
-folders = sorted({os.path.relpath(os.path.dirname(f), ARTIFACTS_DIR) for f in csv_reports})
+folders = sorted(reports["folder"].unique())
 selected_folder = st.selectbox("📁 Select Report Folder", folders)
 
-folder_reports = [f for f in csv_reports if os.path.relpath(os.path.dirname(f), ARTIFACTS_DIR) == selected_folder]
+folder_reports = reports.loc[reports["folder"] == selected_folder, "csv_path"].tolist()
 selected = st.selectbox("📄 Select Report", folder_reports)
 selected_json = selected.replace(".csv", ".json")
 
-df = pd.read_csv(selected)
-if not os.path.exists(selected_json):
+df = report_loader.load_csv(selected)
+detail = report_loader.load_json(selected_json)
+if detail is None:
     st.error(f"❌ Missing JSON file for: {selected_json}")
     st.stop()
-with open(selected_json) as f:
-    detail = json.load(f)
 
 st.success(f"✅ Loaded: {os.path.basename(selected)}")
 
 # === Visualizations ===
-score_df = df[df["Metric"].str.startswith("Score:")].copy()
+score_df = df.loc[df["Metric"].str.startswith("Score:"), ["Metric", "Value"]].copy()
 score_df["Metric"] = score_df["Metric"].str.replace("Score: ", "")
 score_df["Value"] = pd.to_numeric(score_df["Value"], errors="coerce")
 score_df.set_index("Metric", inplace=True)
@@ -192,23 +200,42 @@ st.bar_chart(score_df)
 # === Downloads ===
 with st.sidebar:
     st.markdown("### 📤 Download")
-    st.download_button("⬇️ CSV", open(selected, "rb"), file_name=os.path.basename(selected), mime="text/csv")
-    st.download_button("⬇️ JSON", open(selected_json, "rb"), file_name=os.path.basename(selected_json), mime="application/json")
+    report_loader.download_button("⬇️ CSV", selected, "text/csv", key="dl_csv")
+    report_loader.download_button("⬇️ JSON", selected_json, "application/json", key="dl_json")
+    raw_html = os.path.join(os.path.dirname(selected), "report.html")
+    if artifact_store.resolve(raw_html):
+        report_loader.download_button("🌐 Lighthouse HTML", raw_html, "text/html", key="dl_html")
 
 with st.sidebar.expander("🧾 Export Report"):
-    chart_path = selected.replace(".csv", ".png")
+    # Rendered on request only, then reused from disk (file names carry the report's content hash)
     if not score_df.empty:
-        score_df.plot(kind="bar", legend=False)
-        plt.title("Core Scores")
-        plt.tight_layout()
-        plt.savefig(chart_path)
-        plt.close()
-        st.download_button("📊 Chart Image", open(chart_path, "rb"), file_name=os.path.basename(chart_path), mime="image/png")
-        if st.button("📄 Export PDF"):
-            html = f"<h1>Enterprise UX Report</h1><p>{os.path.basename(selected)}</p><img src='{chart_path}' style='width:100%;max-width:600px;' />{df.to_html(index=False)}"
-            pdf_path = selected.replace(".csv", ".pdf")
-            HTML(string=html).write_pdf(pdf_path)
-            st.download_button("⬇️ PDF", open(pdf_path, "rb"), file_name=os.path.basename(pdf_path), mime="application/pdf")
+        report_loader.download_button("📊 Chart Image", selected, "image/png", key="dl_chart", render=report_export.render_chart)
+        report_loader.download_button("📄 Export PDF", selected, "application/pdf", key="dl_pdf", render=report_export.render_pdf)
+
+with st.sidebar.expander("🗂️ Bulk PDF Export"):
+    bulk_folders = st.multiselect("Folders", sorted(reports["folder"].unique()))
+    bulk_dates = st.date_input("...or audit date range", value=(), key="bulk_dates")
+    # Streamlit rejects a slider whose min equals its max (1-CPU hosts)
+    bulk_workers = st.slider("Worker processes", 1, max(2, os.cpu_count() or 1), min(4, os.cpu_count() or 1))
+    if st.button("📚 Render PDFs"):
+        bulk = reports[reports["folder"].isin(bulk_folders)] if bulk_folders else reports
+        if len(bulk_dates) == 2:
+            day = bulk["timestamp"].str[:10]
+            bulk = bulk[(day >= f"{bulk_dates[0]:%Y-%m-%d}") & (day <= f"{bulk_dates[1]:%Y-%m-%d}")]
+        if bulk.empty or not (bulk_folders or len(bulk_dates) == 2):
+            st.warning("⚠️ Pick folders or a date range with reports in it.")
+        else:
+            with st.spinner(f"Rendering {len(bulk)} PDFs..."):
+                exported = report_export.bulk_export(bulk["csv_path"].tolist(), bulk_workers)
+            pdfs = [pdf for _, pdf, _ in exported if pdf]
+            errors = [(csv, err) for csv, pdf, err in exported if not pdf]
+            st.success(f"✅ Rendered {len(pdfs)} PDFs")
+            for csv, err in errors:
+                st.warning(f"⚠️ {os.path.basename(csv)}: {err}")
+            if pdfs:
+                os.makedirs(os.path.join(ARTIFACTS_DIR, "exports"), exist_ok=True)
+                zip_path = report_export.zip_files(pdfs, os.path.join(ARTIFACTS_DIR, "exports", f"reports_{time.strftime('%Y-%m-%d_%H-%M-%S')}.zip"))
+                st.download_button("⬇️ Download ZIP", report_loader.read_bytes(zip_path), file_name=os.path.basename(zip_path), mime="application/zip")
 
 # === Metric Table ===
 st.subheader("📋 Full Metrics")
@@ -216,16 +243,70 @@ st.dataframe(df, use_container_width=True)
 
 # === Score Trends ===
 with st.expander("📈 Score Trends"):
-    trend_data = []
-    for file in csv_reports:
-        data = pd.read_csv(file)
-        row = {"Date": os.path.basename(file).replace("ux_report_", "").replace(".csv", "")}
-        for _, r in data.iterrows():
-            if r["Metric"].startswith("Score:"):
-                row[r["Metric"].replace("Score: ", "")] = r["Value"]
-        trend_data.append(row)
-    trend_df = pd.DataFrame(trend_data).set_index("Date").sort_index()
-    st.line_chart(trend_df)
+    sites = sorted(reports["site"].dropna().unique())
+    if sites:
+        selected_site = reports.loc[reports["csv_path"] == selected, "site"].iloc[0]
+        t1, t2, t3 = st.columns(3)
+        trend_site = t1.selectbox("🌐 Site", sites, index=sites.index(selected_site) if selected_site in sites else 0)
+        date_range = t2.date_input("📅 Date range", value=())
+        window = t3.slider("Rolling median window", 1, 30, 5)
+        start, end = (list(date_range) + [None, None])[:2]
+
+        site_df = cached_site_metrics(trend_site, start, end, report_catalog.catalog_version(ARTIFACTS_DIR))
+        if site_df.empty:
+            st.info("ℹ️ No reports for this site in the selected range.")
+        else:
+            scores = site_df[report_catalog.SCORE_COLUMNS]
+            timings = site_df[report_catalog.TIMING_COLUMNS]
+            st.markdown(f"**{len(site_df)} reports** · rolling median over {window}")
+            st.line_chart(report_catalog.rolling_median(scores, window))
+            st.line_chart(report_catalog.rolling_median(timings, window))
+            st.dataframe(report_catalog.percentiles(site_df), use_container_width=True)
+
+# === Fleet Overview ===
+with st.expander("🌍 Fleet Overview"):
+    latest, wow = cached_fleet(report_catalog.catalog_version(ARTIFACTS_DIR))
+    st.markdown(f"**{len(latest)} sites** · latest audit per site")
+    st.dataframe(latest[["timestamp"] + fleet.METRICS], use_container_width=True)
+
+    st.markdown("### 📅 Week-over-week change")
+    if wow.empty:
+        st.info("ℹ️ No site has reports in both of the last two weeks.")
+    else:
+        st.dataframe(wow, use_container_width=True)
+        f1, f2 = st.columns(2)
+        fleet_metric = f1.selectbox("Metric", fleet.METRICS, index=fleet.METRICS.index("lcp"))
+        top_n = f2.slider("Top N regressions", 5, 50, 10)
+        regressions = fleet.top_regressions(wow, fleet_metric, top_n)
+        if regressions.empty:
+            st.success(f"✅ No {fleet_metric} regressions this week.")
+        else:
+            st.dataframe(regressions, use_container_width=True)
+
+# === Pipeline Performance ===
+with st.expander("⏱️ Pipeline Performance"):
+    timing_limit = st.slider("Recent audits", 10, 1000, 200, step=10)
+    timing_records = cached_timings(timing_limit)
+    if not timing_records:
+        st.info("ℹ️ No timed audits yet.")
+    else:
+        timing_summary = stage_timing.summarize(timing_records)
+        st.markdown(f"**{len({r['folder'] for r in timing_records})} audits** · per-stage p50 / p95")
+        st.dataframe(pd.DataFrame([
+            {"Stage": name, "Runs": stats["count"],
+             "Wall p50 (s)": stats["wall_s"][0.5], "Wall p95 (s)": stats["wall_s"][0.95],
+             "CPU p50 (s)": stats["cpu_s"][0.5], "CPU p95 (s)": stats["cpu_s"][0.95],
+             "Subprocess CPU p95 (s)": stats["children_cpu_s"][0.95],
+             "Process peak RSS p95 (MB)": stats["peak_rss_mb"][0.95]}
+            for name, stats in timing_summary.items()
+        ]).round(3), use_container_width=True)
+        st.caption("Blank CPU cells: stages awaiting the shared browser pool, whose thread time isn't per-audit. "
+                   "Subprocess CPU is measured per Lighthouse run; peak RSS is the audit process's high-water mark.")
+        t1, t2 = st.columns(2)
+        t1.download_button("📥 Prometheus text", stage_timing.to_prometheus(timing_records), "ux_audit_timings.prom",
+                           "text/plain")
+        t2.download_button("📥 JSON lines", stage_timing.to_jsonl(timing_records), "ux_audit_timings.jsonl",
+                           "application/x-ndjson")
 
 # === Deep Metrics ===
 st.subheader("🧠 Deep Metrics")
@@ -248,12 +329,20 @@ for section, content in detail.items():
 
 # === Heuristic Expert Review ===
 heuristic_path = os.path.join(os.path.dirname(selected), "heuristic_review.json")
-if os.path.exists(heuristic_path):
-    with open(heuristic_path) as f:
-        heuristics = json.load(f)
+heuristics = report_loader.load_json(heuristic_path)
+if heuristics is not None:
     with st.expander("Heuristic Expert Review"):
-        for k, v in heuristics.items():
-            st.markdown(f"**{k}**: {v}")
+        if "Results" in heuristics:
+            st.markdown(f"**{heuristics['Issues']}** of {len(heuristics['Results'])} checks flagged an issue")
+            checks_df = pd.DataFrame(heuristics["Results"])
+            checks_df["Value"] = checks_df["Value"].astype(str)
+            st.dataframe(checks_df, use_container_width=True)
+            with st.expander("Page facts"):
+                st.json(heuristics.get("Page Facts", {}))
+        else:
+            # Placeholder reviews from before the rule engine
+            for k, v in heuristics.items():
+                st.markdown(f"**{k}**: {v}")
 else:
     st.info("ℹ️ No heuristic review found for this report.")
 
@@ -288,11 +377,10 @@ else:
     
 # === Component Check Output ===
 comp_file = os.path.join(os.path.dirname(selected), "components.json")
-if os.path.exists(comp_file):
-    with open(comp_file) as f:
-        comp_data = json.load(f)
+comp_data = report_loader.load_json(comp_file)
+if comp_data is not None:
     with st.expander("🧩 Web Component Validation Results"):
-        st.write("Semantic checks for header, nav, main, footer, buttons, etc.")
+        st.write("Semantic checks for header, nav, main, footer, buttons, etc. — with match counts, visible, enabled and accessibly-named elements.")
         st.dataframe(pd.DataFrame(comp_data))
 else:
     st.info("ℹ️ No component validation available.")
@@ -300,51 +388,91 @@ else:
 # === Report Comparison ===
 if len(csv_reports) >= 2:
     st.subheader("🆚 Compare Reports")
+    cmp_mode = st.radio("Compare", ["Two reports", "Baseline vs. many", "Set A vs. set B"], horizontal=True)
+    label_of = dict(zip(reports["csv_path"], reports["label"]))
+    catalog_v = report_catalog.catalog_version(ARTIFACTS_DIR)
+
+if len(csv_reports) >= 2 and cmp_mode == "Two reports":
     c1, c2 = st.columns(2)
     file1 = c1.selectbox("📄 First Report", csv_reports, index=len(csv_reports)-2, key="cmp1")
     file2 = c2.selectbox("📄 Second Report", csv_reports, index=len(csv_reports)-1, key="cmp2")
 
-    df1, df2 = pd.read_csv(file1), pd.read_csv(file2)
-    merged = pd.merge(df1, df2, on="Metric", suffixes=("_Old", "_New"))
-    merged["Value_Old"] = pd.to_numeric(merged["Value_Old"], errors="coerce")
-    merged["Value_New"] = pd.to_numeric(merged["Value_New"], errors="coerce")
-    merged["Δ"] = merged["Value_New"] - merged["Value_Old"]
-    merged["Δ (Visual)"] = merged["Δ"].apply(lambda x: f"🔺 {x}" if x > 0 else f"🔻 {abs(x)}" if x < 0 else "➖ 0")
+    merged = report_loader.compare(reports, file1, file2)
 
-    st.dataframe(merged[["Metric", "Value_Old", "Value_New", "Δ", "Δ (Visual)"]])
+    st.dataframe(merged[["Metric", "Value_Old", "Value_New", "Δ", "Δ (Visual)", "Significant"]])
+    if (merged["Significant"] == "—").any():
+        st.caption("— = at least one report is a single Lighthouse run, so significance can't be tested. Use multiple runs to filter out noise.")
 
     compare = merged[merged["Metric"].str.startswith("Score:")].copy()
     compare["Metric"] = compare["Metric"].str.replace("Score: ", "")
     compare.set_index("Metric", inplace=True)
     compare["Trend"] = compare.apply(lambda row: format_percent_change(row["Value_Old"], row["Value_New"]), axis=1)
 
-    fig, ax = plt.subplots(figsize=(10, 5))
-    compare[["Value_Old", "Value_New"]].plot(kind="bar", ax=ax)
-    ax.set_title("Core Score Comparison")
-    ax.set_ylabel("Score")
-    ax.set_ylim(0, 110)
-    ax.grid(True, linestyle="--", alpha=0.3)
-    ax.legend(["First Report", "Second Report"], loc="lower right")
-
-    for i, (old_val, new_val) in enumerate(zip(compare["Value_Old"], compare["Value_New"])):
-        ax.text(i - 0.2, old_val + 1, f"{old_val:.0f}", color="blue", ha="center")
-        ax.text(i + 0.2, new_val + 1, f"{new_val:.0f}\n({compare.iloc[i]['Trend']})", color="green", ha="center")
-    ax.set_xticks(range(len(compare.index)))
-    ax.set_xticklabels(compare.index, rotation=0)
-    st.pyplot(fig)
+    st.image(cached_comparison_chart(compare))
 
     st.markdown("### 🧾 Summary Insights")
-    improved = merged[merged["Δ"] > 0]["Metric"].tolist()
-    declined = merged[merged["Δ"] < 0]["Metric"].tolist()
-    neutral = merged[merged["Δ"] == 0]["Metric"].tolist()
+    # Changes that fail the significance test count as noise; timings improve when they drop
+    real = merged["Significant"] != "➖"
+    improved = merged[real & (merged["Change"] == "improved")]["Metric"].tolist()
+    declined = merged[real & (merged["Change"] == "regressed")]["Metric"].tolist()
+    neutral = merged[~real | (merged["Change"] == "unchanged")]["Metric"].tolist()
+    missing = merged[merged["Change"].isin(["added", "removed"])]["Metric"].tolist()
     if improved: st.markdown(f"**📈 Improved ({len(improved)}):** {', '.join(improved)}")
     if declined: st.markdown(f"**📉 Declined ({len(declined)}):** {', '.join(declined)}")
     if neutral: st.markdown(f"**➖ No Change ({len(neutral)}):** {', '.join(neutral)}")
-
-    if not merged.empty:
-        max_gain = merged.sort_values("Δ", ascending=False).iloc[0]
-        max_drop = merged.sort_values("Δ", ascending=True).iloc[0]
+    if missing: st.markdown(f"**❔ Only in one report ({len(missing)}):** {', '.join(missing)}")
+
+    _, violations = report_loader.diff_one_to_many(reports, catalog_v, file1, (file2,))
+    violations = violations.iloc[0]
+    if violations["New Failures"]: st.markdown(f"**🚨 Newly failing audits:** {', '.join(violations['New Failures'])}")
+    if violations["Fixed"]: st.markdown(f"**🩹 Fixed audits:** {', '.join(violations['Fixed'])}")
+
+    # Only scores share a unit (0-100, higher is better), so only they are ranked against each other
+    scored = merged[merged["Metric"].str.startswith("Score:")].dropna(subset=["Δ"])
+    if not scored.empty:
+        max_gain = scored.loc[scored["Δ"].idxmax()]
+        max_drop = scored.loc[scored["Δ"].idxmin()]
         st.markdown("---")
-        st.markdown(f"**🏅 Biggest Gain:** {max_gain['Metric']} (+{max_gain['Δ']:.1f})")
-        st.markdown(f"**📉 Biggest Drop:** {max_drop['Metric']} ({max_drop['Δ']:.1f})")
-
+        if max_gain["Δ"] > 0: st.markdown(f"**🏅 Biggest Score Gain:** {max_gain['Metric']} (+{max_gain['Δ']:.1f})")
+        if max_drop["Δ"] < 0: st.markdown(f"**📉 Biggest Score Drop:** {max_drop['Metric']} ({max_drop['Δ']:.1f})")
+
+elif len(csv_reports) >= 2:
+    if cmp_mode == "Baseline vs. many":
+        baseline = st.selectbox("📄 Baseline", csv_reports, index=0, format_func=label_of.get, key="cmp_base")
+        candidates = st.multiselect("📄 Candidates", [p for p in csv_reports if p != baseline],
+                                    default=[p for p in csv_reports if p != baseline][-10:], format_func=label_of.get)
+        diff, violations = report_loader.diff_one_to_many(reports, catalog_v, baseline, tuple(candidates)) \
+            if candidates else (None, None)
+    else:
+        s1, s2, s3 = st.columns([2, 2, 1])
+        ts = pd.to_datetime(reports["timestamp"], format="%Y-%m-%d_%H-%M-%S", errors="coerce")
+        first, last = ts.min().date(), ts.max().date()
+        range_a = s1.date_input("Set A dates", (first, first + (last - first) / 2), min_value=first, max_value=last, key="cmp_a")
+        range_b = s2.date_input("Set B dates", (first + (last - first) / 2, last), min_value=first, max_value=last, key="cmp_b")
+        pair_on = s3.selectbox("Pair by", ["site", "url"])
+
+        def in_range(date_range):
+            # The picker returns a single date while a range is half-selected
+            start, end = date_range[0], date_range[-1]
+            return tuple(reports.loc[(ts.dt.date >= start) & (ts.dt.date <= end), "csv_path"])
+
+        set_a, set_b = in_range(tuple(range_a)), in_range(tuple(range_b))
+        st.caption(f"Newest report per {pair_on}: {len(set_a)} reports in set A, {len(set_b)} in set B")
+        diff, violations = report_loader.diff_sets(reports, catalog_v, set_a, set_b, pair_on) \
+            if set_a or set_b else (None, None)
+
+    if diff is None or diff.empty:
+        st.info("ℹ️ Nothing to compare for this selection.")
+    else:
+        st.markdown("### Δ per metric")
+        st.dataframe(report_diff.metric_matrix(diff), use_container_width=True)
+        st.markdown("### 🧾 Changes (significant or untested)")
+        st.dataframe(report_diff.summarize(diff), use_container_width=True)
+        if (diff["Significant"] == "—").any():
+            st.caption("Single-run reports can't be tested for significance, so every change on them is counted.")
+        st.markdown("### 🚨 Failed audit changes")
+        st.dataframe(violations[violations["New Failures"].map(len) + violations["Fixed"].map(len) > 0],
+                     use_container_width=True)
+        with st.expander("All metric rows"):
+            st.dataframe(diff[["Key", "Metric", "Value_Old", "Value_New", "Δ", "Change", "Significant"]],
+                         use_container_width=True)
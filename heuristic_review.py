@@ -1,29 +1,227 @@
 import os
 import sys
 import json
+import asyncio
 
-# Step 1: Parse CLI args
-if len(sys.argv) != 3:
-    print("Usage: python heuristic_review.py <url> <output_path>")
-    sys.exit(1)
+import artifact_store
+import lighthouse_parser
 
-url = sys.argv[1]
-output_path = sys.argv[2]
+# Heuristic review engine. Page facts come from one load in the shared Playwright
+# browser pool (the audit's component check load, when the caller passes them in)
+# plus the Lighthouse audits already in report.json; every registered
+# rule then scores those facts, all rules running concurrently.
+MAX_CTAS_ABOVE_FOLD = 12
+MAX_DOM_NODES = 1500          # Lighthouse's "excessive DOM size" threshold
+MAX_DOM_DEPTH = 32
+MAX_SMALL_TAP_TARGET_SHARE = 0.25
+MIN_TAP_TARGET_PX = 24        # WCAG 2.2 target size (minimum)
+MIN_CONTRAST_RATIO = 4.5      # WCAG AA for body text
+MAX_LOW_CONTRAST_SHARE = 0.10
+TEXT_DENSITY_RANGE = (50, 3000)  # visible characters per viewport-height screen
 
-# Step 2: Ensure output folder exists
-os.makedirs(output_path, exist_ok=True)
+PAGE_FACTS_JS = """
+([ctaSelector, minTarget]) => {
+    const vw = window.innerWidth, vh = window.innerHeight;
+    const rect = (el) => el.getBoundingClientRect();
+    const visible = (el) => { const r = rect(el); return r.width > 0 && r.height > 0; };
 
-# Step 3: Placeholder heuristic review result
-results = {
-    "URL": url,
-    "Heuristic": "Aesthetic and minimalist design",
-    "Result": "⚠️ Crowded UI",
-    "Details": "Page has over 12 CTAs above the fold"
+    const elements = document.querySelectorAll("body *");
+    let depth = 0;
+    for (const el of elements) {
+        if (el.childElementCount) continue;
+        let d = 0;
+        for (let p = el; p.parentElement; p = p.parentElement) d++;
+        depth = Math.max(depth, d);
+    }
+
+    const ctas = Array.from(document.querySelectorAll(ctaSelector)).filter((el) => {
+        const r = rect(el);
+        return r.width > 0 && r.height > 0 && r.top < vh && r.bottom > 0 && r.left < vw;
+    });
+    const targets = Array.from(document.querySelectorAll(ctaSelector + ", input, select, textarea")).filter(visible);
+    const small = targets.filter((el) => { const r = rect(el); return r.width < minTarget || r.height < minTarget; });
+
+    const rgba = (c) => {
+        const m = /rgba?\\(([^)]+)\\)/.exec(c);
+        if (!m) return null;
+        const p = m[1].split(",").map(parseFloat);
+        return {r: p[0], g: p[1], b: p[2], a: p.length > 3 ? p[3] : 1};
+    };
+    const background = (el) => {
+        for (; el; el = el.parentElement) {
+            const c = rgba(getComputedStyle(el).backgroundColor);
+            if (c && c.a > 0.5) return c;
+        }
+        return {r: 255, g: 255, b: 255, a: 1};
+    };
+    const luminance = (c) => {
+        const f = (v) => { v /= 255; return v <= 0.03928 ? v / 12.92 : Math.pow((v + 0.055) / 1.055, 2.4); };
+        return 0.2126 * f(c.r) + 0.7152 * f(c.g) + 0.0722 * f(c.b);
+    };
+    const textNodes = Array.from(document.querySelectorAll("p, span, a, li, h1, h2, h3, h4, h5, button, label, td"))
+        .filter((el) => !el.childElementCount && (el.textContent || "").trim() && visible(el))
+        .slice(0, 200);
+    const ratios = textNodes.map((el) => {
+        const fg = rgba(getComputedStyle(el).color);
+        if (!fg) return null;
+        const [hi, lo] = [luminance(fg), luminance(background(el))].sort((a, b) => b - a);
+        return (hi + 0.05) / (lo + 0.05);
+    }).filter((r) => r);
+
+    return {
+        viewport_height: vh,
+        page_height: document.documentElement.scrollHeight,
+        dom_nodes: elements.length,
+        dom_depth: depth,
+        ctas_above_fold: ctas.length,
+        tap_targets: targets.length,
+        small_tap_targets: small.length,
+        contrast_samples: ratios.length,
+        low_contrast: ratios.filter((r) => r < %s).length,
+        text_chars: (document.body.innerText || "").length,
+    };
 }
+""" % MIN_CONTRAST_RATIO
+CTA_SELECTOR = "a[href], button, input[type=submit], input[type=button], [role=button]"
+# (js, arg) for callers that already have the page loaded (component_checker.inspect_page)
+PAGE_FACTS_SCRIPT = (PAGE_FACTS_JS, [CTA_SELECTOR, MIN_TAP_TARGET_PX])
+
+RULES = []
+
+
+def rule(check, heuristic):
+    # Register an async rule: (facts) -> (passed, details, value), or None when not measurable
+    def register(fn):
+        RULES.append((check, heuristic, fn))
+        return fn
+    return register
+
+
+@rule("CTAs above the fold", "Aesthetic and minimalist design")
+async def cta_count(facts):
+    page = facts.get("page")
+    if not page:
+        return None
+    n = page["ctas_above_fold"]
+    return n <= MAX_CTAS_ABOVE_FOLD, f"{n} calls to action in the first viewport (limit {MAX_CTAS_ABOVE_FOLD})", n
+
+
+@rule("DOM size and depth", "Aesthetic and minimalist design")
+async def dom_size(facts):
+    page = facts.get("page") or {}
+    nodes = page.get("dom_nodes") or facts["audits"].get("dom-size", {}).get("numericValue")
+    if nodes is None:
+        return None
+    depth = page.get("dom_depth")
+    passed = nodes <= MAX_DOM_NODES and (depth is None or depth <= MAX_DOM_DEPTH)
+    details = f"{nodes:.0f} elements" + (f", max depth {depth}" if depth is not None else "")
+    return passed, details + f" (limits {MAX_DOM_NODES} / {MAX_DOM_DEPTH})", nodes
+
+
+@rule("Tap target size", "Error prevention")
+async def tap_targets(facts):
+    page = facts.get("page")
+    if page and page["tap_targets"]:
+        share = page["small_tap_targets"] / page["tap_targets"]
+        return (share <= MAX_SMALL_TAP_TARGET_SHARE,
+                f"{page['small_tap_targets']} of {page['tap_targets']} targets under {MIN_TAP_TARGET_PX}px", round(share, 2))
+    audit = facts["audits"].get("target-size") or facts["audits"].get("tap-targets")
+    if audit and audit.get("score") is not None:
+        return audit["score"] >= 0.9, audit.get("displayValue") or audit.get("title", ""), audit["score"]
+    return None
+
+
+@rule("Text contrast", "Visibility of system status")
+async def contrast(facts):
+    page = facts.get("page")
+    if page and page["contrast_samples"]:
+        share = page["low_contrast"] / page["contrast_samples"]
+        return (share <= MAX_LOW_CONTRAST_SHARE,
+                f"{page['low_contrast']} of {page['contrast_samples']} sampled text elements below {MIN_CONTRAST_RATIO}:1",
+                round(share, 2))
+    audit = facts["audits"].get("color-contrast")
+    if audit and audit.get("score") is not None:
+        return audit["score"] == 1, audit.get("title", ""), audit["score"]
+    return None
+
+
+@rule("Text density", "Recognition rather than recall")
+async def text_density(facts):
+    page = facts.get("page")
+    if not page or not page["viewport_height"]:
+        return None
+    screens = max(1, page["page_height"] / page["viewport_height"])
+    density = round(page["text_chars"] / screens)
+    low, high = TEXT_DENSITY_RANGE
+    return low <= density <= high, f"{density} characters per screen (expected {low}-{high})", density
+
+
+async def collect_page_facts(url):
+    # One page load in the component checker's shared browser pool
+    from component_checker import get_pool
+
+    pool = get_pool()
+
+    async def _collect():
+        async with pool.page() as page:
+            await page.goto(url, timeout=10000)
+            return await page.evaluate(*PAGE_FACTS_SCRIPT)
+
+    return await pool.submit(_collect())
+
+
+async def run_rules(facts):
+    async def _run(check, heuristic, fn):
+        try:
+            outcome = await fn(facts)
+        except Exception as e:
+            return {"Check": check, "Heuristic": heuristic, "Result": "➖ Error", "Details": str(e), "Value": None}
+        if outcome is None:
+            return {"Check": check, "Heuristic": heuristic, "Result": "➖ Not measured", "Details": "", "Value": None}
+        passed, details, value = outcome
+        return {"Check": check, "Heuristic": heuristic, "Result": "✅ Pass" if passed else "⚠️ Issue",
+                "Details": details, "Value": value}
+
+    return await asyncio.gather(*(_run(*r) for r in RULES))
+
+
+async def review_async(url, output_path, page_facts=None):
+    # `page_facts`: PAGE_FACTS_SCRIPT's result from a load the caller already made
+    facts = {"audits": {}, "page": page_facts}
+    report_json = artifact_store.resolve(os.path.join(output_path, "report.json"))
+    if report_json:
+        facts["audits"] = lighthouse_parser.parse(report_json)["audits"]
+    if page_facts is None:
+        try:
+            facts["page"] = await collect_page_facts(url)
+        except Exception as e:
+            facts["page_error"] = str(e)
+    return facts, await run_rules(facts)
+
+
+def review(url, output_path, page_facts=None):
+    # Ensure output folder exists
+    os.makedirs(output_path, exist_ok=True)
+
+    facts, checks = asyncio.run(review_async(url, output_path, page_facts))
+    results = {
+        "URL": url,
+        "Issues": sum(1 for c in checks if c["Result"].startswith("⚠️")),
+        "Results": checks,
+        "Page Facts": facts.get("page") or {"error": facts.get("page_error", "not collected")},
+    }
+
+    # Save JSON
+    out_file = os.path.join(output_path, "heuristic_review.json")
+    with open(out_file, "w") as f:
+        json.dump(results, f, indent=2)
+    return results
+
 
-# Step 4: Save JSON
-out_file = os.path.join(output_path, "heuristic_review.json")
-with open(out_file, "w") as f:
-    json.dump(results, f, indent=2)
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python heuristic_review.py <url> <output_path>")
+        sys.exit(1)
 
-print(f"✅ Saved: {out_file}")
\ No newline at end of file
+    review(sys.argv[1], sys.argv[2])
+    print(f"✅ Saved: {os.path.join(sys.argv[2], 'heuristic_review.json')}")
@@ -0,0 +1,179 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process slots (no limit on running jobs)
+    fcntl = None
+
+# Local background runner for audits. Each submitted job is a detached Python
+# process, so it keeps going across Streamlit reruns and browser refreshes; its
+# state lives in artifacts/.jobs/<job_id>.json where the dashboard polls it. At most
+# MAX_RUNNING_JOBS run at once; the rest stay "queued" until a slot frees up.
+JOBS_DIR = os.path.join("artifacts", ".jobs")
+SAVE_INTERVAL = 1.0  # seconds between job-file writes while audits are running
+# Jobs beyond this many wait as "queued" until a running one finishes
+MAX_RUNNING_JOBS = int(os.environ.get("AUDIT_MAX_RUNNING_JOBS", 2))
+SLOT_POLL = 2.0
+
+_children = []
+
+
+def job_path(job_id, jobs_dir=JOBS_DIR):
+    return os.path.join(jobs_dir, f"{job_id}.json")
+
+
+def save(job, jobs_dir=JOBS_DIR):
+    path = job_path(job["id"], jobs_dir)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(job, f)
+    os.replace(tmp, path)
+
+
+def load(job_id, jobs_dir=JOBS_DIR):
+    with open(job_path(job_id, jobs_dir)) as f:
+        return json.load(f)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except (OSError, TypeError):
+        return False
+    return True
+
+
+def list_jobs(limit=20, jobs_dir=JOBS_DIR):
+    # Reap finished job processes started from this one
+    _children[:] = [p for p in _children if p.poll() is None]
+    if not os.path.isdir(jobs_dir):
+        return []
+    names = sorted((n for n in os.listdir(jobs_dir) if n.endswith(".json")), reverse=True)[:limit]
+    jobs = []
+    for name in names:
+        try:
+            with open(os.path.join(jobs_dir, name)) as f:
+                job = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        if job["status"] in ("queued", "running") and job.get("pid") and not _alive(job["pid"]):
+            job["status"] = "interrupted"
+        jobs.append(job)
+    return jobs
+
+
+def submit(urls, workers=1, runs=1, use_cache=False, jobs_dir=JOBS_DIR):
+    os.makedirs(jobs_dir, exist_ok=True)
+    # Sortable ids: newest jobs list first
+    job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    job = {
+        "id": job_id,
+        "status": "queued",
+        "created": time.time(),
+        "started": None,
+        "finished": None,
+        "urls": list(urls),
+        "workers": workers,
+        "runs": runs,
+        "use_cache": use_cache,
+        "stages": {url: "queued" for url in urls},
+        "results": [],
+        "pid": None,
+    }
+    save(job, jobs_dir)
+
+    # The child records its own pid once it starts, so nothing here races its writes
+    with open(os.path.join(jobs_dir, f"{job_id}.log"), "w") as log:
+        _children.append(subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), job_id, "--jobs-dir", jobs_dir],
+            stdout=log, stderr=subprocess.STDOUT, start_new_session=True,
+        ))
+    return job_id
+
+
+@contextmanager
+def file_slot(lock_dir, slots, poll=SLOT_POLL):
+    # Holds one of `slots` lock files in `lock_dir`, shared by every process on the host
+    # that uses the same directory. The kernel drops the lock when the process exits, so
+    # a crashed holder never keeps its slot.
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(lock_dir, exist_ok=True)
+    while True:
+        for n in range(max(1, slots)):
+            f = open(os.path.join(lock_dir, f"slot-{n}.lock"), "w")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                continue
+            with f:
+                yield
+            return
+        time.sleep(poll)
+
+
+def prune_jobs(jobs_dir=JOBS_DIR, days=30, dry_run=False):
+    # Job files (<id>.json / <id>.log) of jobs that ended more than `days` ago; returns (files, bytes)
+    if not os.path.isdir(jobs_dir):
+        return 0, 0
+    cutoff = time.time() - days * 86400
+    files = freed = 0
+    for job in list_jobs(limit=None, jobs_dir=jobs_dir):
+        if job["status"] in ("queued", "running") or (job["finished"] or job["created"]) >= cutoff:
+            continue
+        for path in (job_path(job["id"], jobs_dir), os.path.join(jobs_dir, f"{job['id']}.log")):
+            if os.path.exists(path):
+                files += 1
+                freed += os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+    return files, freed
+
+
+def run(job_id, jobs_dir=JOBS_DIR):
+    job = load(job_id, jobs_dir)
+    job.update(pid=os.getpid())
+    save(job, jobs_dir)
+    with file_slot(jobs_dir, MAX_RUNNING_JOBS):
+        _run(job, jobs_dir)
+
+
+def _run(job, jobs_dir):
+    job.update(status="running", started=time.time())
+    save(job, jobs_dir)
+
+    stages = job["stages"]
+    last_save = 0
+    try:
+        import audit_pipeline
+        for result in audit_pipeline.run_batch(job["urls"], job["workers"], on_stage=stages.__setitem__, poll=SAVE_INTERVAL,
+                                               use_cache=job["use_cache"], runs=job["runs"]):
+            if result:
+                job["results"].append(result)
+                print(f"{result['Status']} {result['URL']} {result['Error']}", flush=True)
+            if result or time.time() - last_save >= SAVE_INTERVAL:
+                save(job, jobs_dir)
+                last_save = time.time()
+        job["status"] = "done"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+    job["finished"] = time.time()
+    save(job, jobs_dir)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a submitted audit job.")
+    parser.add_argument("job_id")
+    parser.add_argument("--jobs-dir", default=JOBS_DIR)
+    args = parser.parse_args()
+    run(args.job_id, args.jobs_dir)
@@ -0,0 +1,134 @@
+import functools
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+# Opt-in cache of Lighthouse outputs for pages that have not changed. Entries are
+# keyed by URL, Lighthouse flags/version and a cheap fingerprint of the page, and
+# live under artifacts/.lighthouse_cache/<key>/ with a TTL and an LRU size cap.
+CACHE_SUBDIR = ".lighthouse_cache"
+CACHE_DIR = os.path.join("artifacts", CACHE_SUBDIR)
+ENABLED = os.environ.get("LIGHTHOUSE_CACHE", "0") == "1"
+TTL = int(os.environ.get("LIGHTHOUSE_CACHE_TTL", 24 * 3600))
+MAX_BYTES = int(os.environ.get("LIGHTHOUSE_CACHE_MAX_MB", 1024)) * 1024 * 1024
+
+INDEX_FILE = "index.json"
+LOCK_FILE = "index.lock"
+FILES = ("report.json", "report.html")
+
+
+@functools.lru_cache(maxsize=1)
+def lighthouse_version():
+    try:
+        return subprocess.run(["lighthouse", "--version"], capture_output=True, text=True, timeout=30).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def fingerprint(url, headers=None, timeout=10):
+    # Validators from the preflight response headers when the server sends them, else a body hash
+    validators = [(headers or {}).get(h) for h in ("ETag", "Last-Modified")]
+    if any(validators):
+        return "|".join(v or "" for v in validators)
+    resp = requests.get(url, timeout=timeout)
+    resp.raise_for_status()
+    return "sha256:" + hashlib.sha256(resp.content).hexdigest()
+
+
+def cache_key(url, flags, page_fingerprint):
+    payload = json.dumps([url, list(flags), lighthouse_version(), page_fingerprint])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LighthouseCache:
+    def __init__(self, cache_dir=CACHE_DIR, ttl=TTL, max_bytes=MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        # Audit jobs run in separate processes, so the index read-modify-write is
+        # serialised with an flock on a sidecar file as well as the thread lock
+        with self._lock, open(os.path.join(self.cache_dir, LOCK_FILE), "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path()) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self, index):
+        tmp = f"{self._index_path()}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, self._index_path())
+
+    def get(self, key, dest_json, dest_html):
+        # Copy a fresh entry to the destination paths; False on miss or expiry
+        with self._locked():
+            index = self._load_index()
+            entry = index.get(key)
+            entry_dir = os.path.join(self.cache_dir, key)
+            if not entry or time.time() - entry["created"] > self.ttl or not os.path.isdir(entry_dir):
+                return False
+            shutil.copy(os.path.join(entry_dir, FILES[0]), dest_json)
+            shutil.copy(os.path.join(entry_dir, FILES[1]), dest_html)
+            entry["last_used"] = time.time()
+            self._save_index(index)
+            return True
+
+    def put(self, key, json_path, html_path, url=None):
+        with self._locked():
+            entry_dir = os.path.join(self.cache_dir, key)
+            os.makedirs(entry_dir, exist_ok=True)
+            shutil.copy(json_path, os.path.join(entry_dir, FILES[0]))
+            shutil.copy(html_path, os.path.join(entry_dir, FILES[1]))
+            size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in FILES)
+            now = time.time()
+            index = self._load_index()
+            index[key] = {"url": url, "created": now, "last_used": now, "size": size}
+            self._evict(index)
+            self._save_index(index)
+
+    def _evict(self, index):
+        # Drop expired entries, then least recently used ones until under the size cap
+        now = time.time()
+        doomed = [k for k, e in index.items() if now - e["created"] > self.ttl]
+        live = sorted((k for k in index if k not in doomed), key=lambda k: index[k]["last_used"])
+        total = sum(index[k]["size"] for k in live)
+        while live and total > self.max_bytes:
+            k = live.pop(0)
+            total -= index[k]["size"]
+            doomed.append(k)
+        # Entry directories missing from the index (lost by older, unlocked writers) are orphans
+        orphans = [name for name in os.listdir(self.cache_dir)
+                   if name not in index and os.path.isdir(os.path.join(self.cache_dir, name))]
+        for k in doomed + orphans:
+            index.pop(k, None)
+            shutil.rmtree(os.path.join(self.cache_dir, k), ignore_errors=True)
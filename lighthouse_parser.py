@@ -0,0 +1,189 @@
+import gzip
+import io
+import json
+import re
+
+# Incremental reader for Lighthouse report.json. Only the fields the analysis
+# needs are decoded; screenshots, treemap data and audit `details` are scanned
+# past in CHUNK_SIZE pieces without ever being held in memory as a whole.
+CHUNK_SIZE = 1 << 16
+
+TOP_LEVEL_FIELDS = {"finalUrl", "requestedUrl", "lighthouseVersion", "fetchTime"}
+CATEGORY_FIELDS = {"score", "title"}
+AUDIT_FIELDS = {"score", "title", "numericValue", "displayValue"}
+
+# Everything up to the next bracket, with complete strings consumed in one go; a lone
+# quote means a string runs past the end of the buffer
+_SKIP_TO_BRACKET = re.compile(r'(?:[^"\[\]{}]|"[^"\\]*(?:\\.[^"\\]*)*")*([\[\]{}]|")')
+_NON_WS = re.compile(r"\S")
+_SCALAR = re.compile(r"[^\s,\]}]+(?=[\s,\]}])")
+
+
+class _Reader:
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.mark = None   # start of a value being kept whole; never dropped on refill
+        self.shift = 0
+
+    def _fill(self):
+        # Drop consumed text before the cursor (or the mark) and append the next chunk
+        chunk = self.f.read(CHUNK_SIZE)
+        start = self.pos if self.mark is None else min(self.mark, self.pos)
+        self.buf = self.buf[start:] + chunk
+        self.pos -= start
+        if self.mark is not None:
+            self.mark -= start
+        self.shift = start
+        return bool(chunk)
+
+    def peek(self):
+        while True:
+            m = _NON_WS.search(self.buf, self.pos)
+            if m:
+                self.pos = m.start()
+                return self.buf[self.pos]
+            self.pos = len(self.buf)
+            if not self._fill():
+                raise ValueError("Unexpected end of Lighthouse report")
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise ValueError(f"Expected {ch!r} at offset {self.pos}, got {self.buf[self.pos]!r}")
+        self.pos += 1
+
+    def _string_end(self, skip=False):
+        # Index just past the closing quote of the string starting at self.pos.
+        # When skipping, the cursor follows the scan so huge strings never accumulate.
+        i = self.pos + 1
+        while True:
+            j = self.buf.find('"', i)
+            if j == -1:
+                if skip:
+                    self.pos = len(self.buf.rstrip("\\"))
+                i = len(self.buf)
+                if not self._fill():
+                    raise ValueError("Unterminated string in Lighthouse report")
+                i -= self.shift
+                continue
+            k = j - 1
+            while k >= self.pos and self.buf[k] == "\\":
+                k -= 1
+            if (j - k - 1) % 2 == 0:
+                return j + 1
+            i = j + 1
+
+    def read_string(self):
+        self.peek()
+        end = self._string_end()
+        value = json.loads(self.buf[self.pos:end])
+        self.pos = end
+        return value
+
+    def _scalar_end(self):
+        while True:
+            m = _SCALAR.match(self.buf, self.pos)
+            if m:
+                return m.end()
+            if not self._fill():
+                return len(self.buf)
+
+    def read_value(self):
+        # Fully decode a (small) value: scalars, strings or short containers
+        ch = self.peek()
+        if ch == '"':
+            return self.read_string()
+        if ch in "{[":
+            self.mark = self.pos
+            try:
+                self.skip_value()
+                return json.loads(self.buf[self.mark:self.pos])
+            finally:
+                self.mark = None
+        end = self._scalar_end()
+        value = json.loads(self.buf[self.pos:end])
+        self.pos = end
+        return value
+
+    def skip_value(self):
+        ch = self.peek()
+        if ch == '"':
+            self.pos = self._string_end(skip=True)
+            return
+        if ch not in "{[":
+            self.pos = self._scalar_end()
+            return
+        depth = 0
+        while True:
+            m = _SKIP_TO_BRACKET.match(self.buf, self.pos)
+            if not m:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("Unterminated container in Lighthouse report")
+                continue
+            ch = m.group(1)
+            if ch == '"':
+                self.pos = m.start(1)
+                self.pos = self._string_end(skip=True)
+                continue
+            self.pos = m.end()
+            depth += 1 if ch in "{[" else -1
+            if depth == 0:
+                return
+
+    def iter_object(self):
+        # Yields each key; the caller must read or skip its value before resuming
+        if self.peek() != "{":
+            self.skip_value()
+            return
+        self.pos += 1
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.read_string()
+            self.expect(":")
+            yield key
+            ch = self.peek()
+            self.pos += 1
+            if ch == "}":
+                return
+            if ch != ",":
+                raise ValueError(f"Expected ',' or '}}' at offset {self.pos - 1}, got {ch!r}")
+
+
+def _read_fields(reader, fields):
+    out = {}
+    for key in reader.iter_object():
+        if key in fields:
+            out[key] = reader.read_value()
+        else:
+            reader.skip_value()
+    return out
+
+
+def parse_stream(f):
+    reader = _Reader(f)
+    data = {"categories": {}, "audits": {}}
+    for key in reader.iter_object():
+        if key in ("categories", "audits"):
+            fields = CATEGORY_FIELDS if key == "categories" else AUDIT_FIELDS
+            for item_id in reader.iter_object():
+                data[key][item_id] = _read_fields(reader, fields)
+        elif key in TOP_LEVEL_FIELDS:
+            data[key] = reader.read_value()
+        else:
+            reader.skip_value()
+    return data
+
+
+def parse(path):
+    # Same shape as the Lighthouse JSON, reduced to the fields listed above.
+    # Gzip-compressed reports (report.json.gz) are decompressed on the fly.
+    with (gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")) as f:
+        return parse_stream(io.TextIOWrapper(f, encoding="utf-8"))
+
+
+def parse_bytes(raw):
+    return parse_stream(io.TextIOWrapper(io.BytesIO(raw), encoding="utf-8"))
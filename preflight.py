@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import aiohttp
+
+# Preflight stage: validates many URLs at once over one pooled aiohttp session.
+# Redirects are resolved here, once, and later stages audit the final URL.
+CONCURRENCY = 20
+TIMEOUT = 10
+CACHE_HEADERS = ("ETag", "Last-Modified")
+
+
+async def _request(session, method, url):
+    started = time.perf_counter()
+    async with session.request(method, url, allow_redirects=True) as resp:
+        return {
+            "status": resp.status,
+            "final_url": str(resp.url),
+            "redirects": len(resp.history),
+            "method": method,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000),
+            "headers": {h: resp.headers[h] for h in CACHE_HEADERS if h in resp.headers},
+        }
+
+
+async def _check(session, slots, url):
+    result = {"url": url, "ok": False, "error": ""}
+    async with slots:
+        # Some servers reject HEAD outright (an error status or a dropped connection);
+        # ask again with GET before failing the URL
+        try:
+            result.update(await _request(session, "HEAD", url))
+            retry = result["status"] >= 400
+        except Exception:
+            retry = True
+        try:
+            if retry:
+                result.update(await _request(session, "GET", url))
+        except Exception as e:
+            result["error"] = f"Failed to connect: {str(e) or type(e).__name__}"
+            return result
+    if result["status"] >= 400:
+        result["error"] = f"URL responded with status {result['status']}"
+    else:
+        result["ok"] = True
+    return result
+
+
+async def check_many(urls, concurrency=CONCURRENCY, timeout=TIMEOUT):
+    # {url: result} for every URL, checked `concurrency` at a time
+    slots = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        results = await asyncio.gather(*(_check(session, slots, url) for url in urls))
+    return dict(zip(urls, results))
+
+
+def run(urls, concurrency=CONCURRENCY, timeout=TIMEOUT):
+    return asyncio.run(check_many(list(urls), concurrency, timeout))
+
+
+def check(url, timeout=TIMEOUT):
+    return run([url], 1, timeout)[url]
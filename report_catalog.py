@@ -0,0 +1,191 @@
+import glob
+import json
+import os
+import sqlite3
+
+import pandas as pd
+
+# Persistent index of every UX report under artifacts/, so the dashboard
+# never has to rescan the folder tree or re-read CSVs on a rerun.
+ARTIFACTS_DIR = "artifacts"
+CATALOG_FILE = "catalog.sqlite"
+
+# CSV "Metric" label -> catalog column
+METRIC_COLUMNS = {
+    "Score: Performance": "performance",
+    "Score: Accessibility": "accessibility",
+    "Score: Seo": "seo",
+    "Score: Best-Practices": "best_practices",
+    "First Contentful Paint": "fcp",
+    "Largest Contentful Paint": "lcp",
+    "Total Blocking Time": "tbt",
+    "Cumulative Layout Shift": "cls",
+    "Speed Index": "speed_index",
+    "Time to Interactive": "tti",
+}
+SCORE_COLUMNS = ["performance", "accessibility", "seo", "best_practices"]
+TIMING_COLUMNS = ["fcp", "lcp", "tbt", "cls", "speed_index", "tti"]
+
+COLUMNS = {
+    "csv_file": "TEXT PRIMARY KEY",
+    "folder": "TEXT",
+    "site": "TEXT",
+    "url": "TEXT",
+    "timestamp": "TEXT",
+    "serial": "TEXT",
+    **{col: "REAL" for col in METRIC_COLUMNS.values()},
+    "violations": "TEXT",
+    # Multi-run sampling: number of Lighthouse runs and per-metric variance
+    "runs": "INTEGER",
+    **{f"{col}_var": "REAL" for col in METRIC_COLUMNS.values()},
+}
+
+
+def catalog_path(artifacts_dir=ARTIFACTS_DIR):
+    return os.path.join(artifacts_dir, CATALOG_FILE)
+
+
+def connect(artifacts_dir=ARTIFACTS_DIR):
+    os.makedirs(artifacts_dir, exist_ok=True)
+    conn = sqlite3.connect(catalog_path(artifacts_dir), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS reports (csv_file TEXT PRIMARY KEY)")
+    # Add any columns missing from an older catalog
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(reports)")}
+    for col, col_type in COLUMNS.items():
+        if col not in existing:
+            conn.execute(f"ALTER TABLE reports ADD COLUMN {col} {col_type.replace(' PRIMARY KEY', '')}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_site_ts ON reports (site, timestamp)")
+    conn.execute("CREATE TABLE IF NOT EXISTS catalog_version (version INTEGER NOT NULL)")
+    if conn.execute("SELECT 1 FROM catalog_version").fetchone() is None:
+        conn.execute("INSERT INTO catalog_version VALUES (0)")
+        conn.commit()
+    return conn
+
+
+def _bump_version(conn):
+    # In the writing transaction, so readers never see new rows under an old version
+    conn.execute("UPDATE catalog_version SET version = version + 1")
+
+
+def add_report(csv_path, meta, rows, violations, stats=None, artifacts_dir=ARTIFACTS_DIR):
+    # Reports outside the tree would be indexed as "../..." paths that retention then deletes from
+    if os.path.relpath(csv_path, artifacts_dir).startswith(os.pardir):
+        raise ValueError(f"{csv_path} is not inside {artifacts_dir}")
+    record = {
+        "csv_file": os.path.relpath(csv_path, artifacts_dir),
+        "folder": os.path.relpath(os.path.dirname(csv_path), artifacts_dir),
+        "site": meta.get("site"),
+        "url": meta.get("url"),
+        "timestamp": meta.get("timestamp"),
+        "serial": meta.get("serial"),
+        "violations": json.dumps(violations),
+    }
+    for label, value in rows:
+        if label in METRIC_COLUMNS:
+            record[METRIC_COLUMNS[label]] = None if pd.isnull(value) else float(value)
+    for label, stat in (stats or {}).items():
+        if label in METRIC_COLUMNS:
+            record[f"{METRIC_COLUMNS[label]}_var"] = float(stat["variance"])
+            record["runs"] = int(stat["runs"])
+
+    cols = ", ".join(record)
+    marks = ", ".join("?" for _ in record)
+    with connect(artifacts_dir) as conn:
+        conn.execute(f"INSERT OR REPLACE INTO reports ({cols}) VALUES ({marks})", list(record.values()))
+        _bump_version(conn)
+    conn.close()
+
+
+def load_reports(artifacts_dir=ARTIFACTS_DIR):
+    with connect(artifacts_dir) as conn:
+        df = pd.read_sql_query("SELECT * FROM reports ORDER BY csv_file", conn)
+    conn.close()
+    # object dtype so the .str calls below also work on an empty catalog
+    df["csv_path"] = pd.Series([os.path.join(artifacts_dir, f) for f in df["csv_file"]], index=df.index, dtype=object)
+    df["json_path"] = df["csv_path"].str.replace(r"\.csv$", ".json", regex=True)
+    df["label"] = df["csv_file"].map(os.path.basename).str.replace("ux_report_", "", regex=False).str.replace(".csv", "", regex=False)
+    return df
+
+
+def catalog_version(artifacts_dir=ARTIFACTS_DIR):
+    # Counter bumped by every write; cheap enough to pass as a cache key on every rerun
+    with connect(artifacts_dir) as conn:
+        version = conn.execute("SELECT version FROM catalog_version").fetchone()[0]
+    conn.close()
+    return version
+
+
+def query_metrics(site, start=None, end=None, artifacts_dir=ARTIFACTS_DIR):
+    # One site's metric history (optionally within [start, end] dates), oldest first,
+    # indexed by audit time. Served from the (site, timestamp) index.
+    sql = f"SELECT timestamp, {', '.join(METRIC_COLUMNS.values())} FROM reports WHERE site = ?"
+    params = [site]
+    if start:
+        sql += " AND timestamp >= ?"
+        params.append(f"{start:%Y-%m-%d}")
+    if end:
+        sql += " AND timestamp < ?"
+        params.append(f"{end:%Y-%m-%d}~")
+    with connect(artifacts_dir) as conn:
+        df = pd.read_sql_query(sql + " ORDER BY timestamp", conn, params=params)
+    conn.close()
+    df.index = pd.to_datetime(df.pop("timestamp"), format="%Y-%m-%d_%H-%M-%S", errors="coerce")
+    return df[df.index.notnull()]
+
+
+def rolling_median(df, window=5):
+    return df.rolling(window, min_periods=1).median()
+
+
+def percentiles(df, quantiles=(0.5, 0.75, 0.9, 0.95)):
+    out = df.quantile(list(quantiles)).T
+    out.columns = [f"p{round(q * 100)}" for q in quantiles]
+    return out
+
+
+def rebuild(artifacts_dir=ARTIFACTS_DIR):
+    # Full rescan of artifacts/: indexes reports written before the catalog existed and
+    # drops rows whose report folder has since been deleted
+    count = 0
+    found = glob.glob(os.path.join(artifacts_dir, "**", "ux_report_*.csv"), recursive=True)
+    for csv_path in found:
+        try:
+            df = pd.read_csv(csv_path)
+        except Exception as e:
+            print(f"⚠️ Skipping {csv_path}: {e}")
+            continue
+
+        meta_path = os.path.join(os.path.dirname(csv_path), "report_meta.json")
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+
+        json_path = csv_path[:-len(".csv")] + ".json"
+        violations = []
+        if os.path.exists(json_path):
+            with open(json_path) as f:
+                violations = json.load(f).get("Violations", [])
+
+        rows = list(zip(df["Metric"], pd.to_numeric(df["Value"], errors="coerce")))
+        stats = None
+        if "Variance" in df and "Runs" in df:
+            stats = {r["Metric"]: {"variance": r["Variance"], "runs": r["Runs"]} for r in df.to_dict("records")}
+        add_report(csv_path, meta, rows, violations, stats, artifacts_dir)
+        count += 1
+
+    present = {os.path.relpath(p, artifacts_dir) for p in found}
+    with connect(artifacts_dir) as conn:
+        stale = [(f,) for (f,) in conn.execute("SELECT csv_file FROM reports") if f not in present]
+        conn.executemany("DELETE FROM reports WHERE csv_file = ?", stale)
+        if stale:
+            _bump_version(conn)
+    conn.close()
+    return count
+
+
+if __name__ == "__main__":
+    import sys
+    target = sys.argv[1] if len(sys.argv) > 1 else ARTIFACTS_DIR
+    print(f"✅ Indexed {rebuild(target)} reports into {catalog_path(target)}")
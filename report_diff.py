@@ -0,0 +1,125 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+import report_catalog
+
+# Comparison engine over catalog rows. Every comparison is a set of (old, new)
+# report pairs: one baseline against many candidates, or set A against set B
+# paired by site/url. Pairs are outer-joined so a metric or page missing on one
+# side shows up as added/removed instead of being dropped, and all metrics of all
+# pairs are diffed in one numpy pass.
+METRICS = report_catalog.SCORE_COLUMNS + report_catalog.TIMING_COLUMNS
+LABELS = {col: label for label, col in report_catalog.METRIC_COLUMNS.items()}
+# +1: higher is better (scores), -1: lower is better (timings)
+DIRECTION = np.array([1 if m in report_catalog.SCORE_COLUMNS else -1 for m in METRICS])
+
+PAIR_COLUMNS = ["csv_file", "label", "site", "url", "timestamp", "runs", "violations",
+                *METRICS, *(f"{m}_var" for m in METRICS)]
+
+
+def flag_significant(diff, z=1.96):
+    # Welch-style z-test on sampled reports; single-run reports have no variance to test ("—")
+    se = np.sqrt(diff["Variance_Old"].fillna(0) / diff["Runs_Old"] + diff["Variance_New"].fillna(0) / diff["Runs_New"])
+    sampled = (diff["Runs_Old"] > 1) & (diff["Runs_New"] > 1)
+    return np.where(~sampled, "—", np.where(diff["Δ"].abs() > z * se, "✅", "➖"))
+
+
+def _rows(reports, columns=PAIR_COLUMNS):
+    return reports.reindex(columns=columns)
+
+
+def pair(old, new, on):
+    # Outer join of two catalog row sets on `on`; one row per pair, "_old"/"_new" suffixes
+    return _rows(old).assign(key=old[on].to_numpy()).merge(
+        _rows(new).assign(key=new[on].to_numpy()), on="key", how="outer", suffixes=("_old", "_new"), sort=True)
+
+
+def diff_pairs(pairs):
+    # Long frame: one row per (pair, metric) with Value_Old/Value_New, Δ, Change and Significant
+    n, m = len(pairs), len(METRICS)
+    old = pairs[[f"{c}_old" for c in METRICS]].to_numpy(dtype=float)
+    new = pairs[[f"{c}_new" for c in METRICS]].to_numpy(dtype=float)
+    delta = new - old
+    better = delta * DIRECTION
+
+    change = np.select(
+        [np.isnan(old) & np.isnan(new), np.isnan(old), np.isnan(new), better > 0, better < 0],
+        ["missing", "added", "removed", "improved", "regressed"], "unchanged")
+    runs_old = pairs["runs_old"].fillna(1).to_numpy(dtype=float)
+    runs_new = pairs["runs_new"].fillna(1).to_numpy(dtype=float)
+
+    out = pd.DataFrame({
+        "Key": np.repeat(pairs["key"].to_numpy(), m),
+        "Old": np.repeat(pairs["label_old"].to_numpy(), m),
+        "New": np.repeat(pairs["label_new"].to_numpy(), m),
+        "Metric": np.tile([LABELS[c] for c in METRICS], n),
+        "Value_Old": old.ravel(),
+        "Value_New": new.ravel(),
+        "Δ": delta.ravel(),
+        "Change": change.ravel(),
+        "Variance_Old": pairs[[f"{c}_var_old" for c in METRICS]].to_numpy(dtype=float).ravel(),
+        "Variance_New": pairs[[f"{c}_var_new" for c in METRICS]].to_numpy(dtype=float).ravel(),
+        "Runs_Old": np.repeat(runs_old, m),
+        "Runs_New": np.repeat(runs_new, m),
+    })
+    out["Significant"] = flag_significant(out)
+    return out[out["Change"] != "missing"].reset_index(drop=True)
+
+
+def _violation_sets(column):
+    return [set(json.loads(v)) if isinstance(v, str) and v else set() for v in column]
+
+
+def diff_violations(pairs):
+    # Failed audits that appeared (New Failures) or went away (Fixed) per pair
+    old = _violation_sets(pairs["violations_old"])
+    new = _violation_sets(pairs["violations_new"])
+    added = [sorted(b - a) for a, b in zip(old, new)]
+    fixed = [sorted(a - b) for a, b in zip(old, new)]
+    return pd.DataFrame({
+        "Key": pairs["key"].to_numpy(),
+        "Old": pairs["label_old"].to_numpy(),
+        "New": pairs["label_new"].to_numpy(),
+        "New Failures": added,
+        "Fixed": fixed,
+        "Δ Failures": [len(a) - len(f) for a, f in zip(added, fixed)],
+    })
+
+
+def one_to_many(reports, baseline, candidates):
+    # `baseline` / `candidates`: csv_path values from report_catalog.load_reports()
+    by_path = reports.set_index("csv_path", drop=False)
+    new = by_path.loc[list(candidates)]
+    old = by_path.loc[[baseline] * len(new)]
+    pairs = pair(old.assign(pair_id=range(len(new))), new.assign(pair_id=range(len(new))), "pair_id")
+    pairs["key"] = pairs["label_new"]
+    return diff_pairs(pairs), diff_violations(pairs)
+
+
+def latest(reports, on):
+    # Newest report per `on` value (the catalog's timestamps sort chronologically)
+    return reports.sort_values("timestamp", kind="stable").drop_duplicates(on, keep="last")
+
+
+def set_vs_set(reports, set_a, set_b, on="site"):
+    # Each set's newest report per site (or url), paired across the two sets
+    by_path = reports.set_index("csv_path", drop=False)
+    a = latest(by_path.loc[list(set_a)], on)
+    b = latest(by_path.loc[list(set_b)], on)
+    pairs = pair(a, b, on)
+    return diff_pairs(pairs), diff_violations(pairs)
+
+
+def summarize(diff):
+    # Per-pair counts of significant-or-untested improvements/regressions
+    real = diff[diff["Significant"] != "➖"]
+    counts = pd.crosstab(real["Key"], real["Change"])
+    return counts.reindex(columns=["improved", "regressed", "added", "removed"], fill_value=0)
+
+
+def metric_matrix(diff, value="Δ"):
+    # Pairs x metrics pivot, metrics in catalog order
+    table = diff.pivot_table(index="Key", columns="Metric", values=value, aggfunc="first", sort=False)
+    return table.reindex(columns=[LABELS[c] for c in METRICS if LABELS[c] in table.columns])
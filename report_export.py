@@ -0,0 +1,110 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import pathlib
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# Chart and PDF rendering for reports. Outputs are named after a hash of the report
+# CSV and written next to it, so each one is rendered once and then reused.
+# matplotlib and WeasyPrint are imported only when something is actually rendered.
+
+
+def content_hash(csv_path):
+    with open(csv_path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:10]
+
+
+def _output_path(csv_path, ext):
+    return f"{csv_path[:-len('.csv')]}.{content_hash(csv_path)}.{ext}"
+
+
+def _score_frame(df):
+    score_df = df.loc[df["Metric"].str.startswith("Score:"), ["Metric", "Value"]].copy()
+    score_df["Metric"] = score_df["Metric"].str.replace("Score: ", "")
+    score_df["Value"] = pd.to_numeric(score_df["Value"], errors="coerce")
+    return score_df.set_index("Metric")
+
+
+def render_chart(csv_path):
+    chart_path = _output_path(csv_path, "png")
+    if os.path.exists(chart_path):
+        return chart_path
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    score_df = _score_frame(pd.read_csv(csv_path))
+    fig, ax = plt.subplots()
+    score_df.plot(kind="bar", legend=False, ax=ax)
+    ax.set_title("Core Scores")
+    fig.tight_layout()
+    fig.savefig(chart_path)
+    plt.close(fig)
+    return chart_path
+
+
+def render_pdf(csv_path):
+    pdf_path = _output_path(csv_path, "pdf")
+    if os.path.exists(pdf_path):
+        return pdf_path
+
+    from weasyprint import HTML
+
+    df = pd.read_csv(csv_path)
+    chart_uri = pathlib.Path(render_chart(csv_path)).resolve().as_uri()
+    html = f"<h1>Enterprise UX Report</h1><p>{os.path.basename(csv_path)}</p><img src='{chart_uri}' style='width:100%;max-width:600px;' />{df.to_html(index=False)}"
+    HTML(string=html).write_pdf(pdf_path)
+    return pdf_path
+
+
+def render_comparison_chart(compare):
+    # `compare`: score rows indexed by category with Value_Old, Value_New and Trend
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    compare[["Value_Old", "Value_New"]].plot(kind="bar", ax=ax)
+    ax.set_title("Core Score Comparison")
+    ax.set_ylabel("Score")
+    ax.set_ylim(0, 110)
+    ax.grid(True, linestyle="--", alpha=0.3)
+    ax.legend(["First Report", "Second Report"], loc="lower right")
+
+    for i, (old_val, new_val) in enumerate(zip(compare["Value_Old"], compare["Value_New"])):
+        ax.text(i - 0.2, old_val + 1, f"{old_val:.0f}", color="blue", ha="center")
+        ax.text(i + 0.2, new_val + 1, f"{new_val:.0f}\n({compare.iloc[i]['Trend']})", color="green", ha="center")
+    ax.set_xticks(range(len(compare.index)))
+    ax.set_xticklabels(compare.index, rotation=0)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def _safe_render_pdf(csv_path):
+    try:
+        return csv_path, render_pdf(csv_path), ""
+    except Exception as e:
+        return csv_path, None, str(e)
+
+
+def bulk_export(csv_paths, workers=None):
+    # Render PDFs for many reports in a process pool; returns (csv, pdf, error) tuples.
+    # "spawn" keeps workers independent of the calling process's threads (e.g. Streamlit).
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        return list(pool.map(_safe_render_pdf, csv_paths))
+
+
+def zip_files(paths, zip_path):
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for path in paths:
+            zf.write(path, arcname=os.path.basename(path))
+    return zip_path
@@ -0,0 +1,92 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import artifact_store
+import report_diff
+
+# Report-loading layer for the dashboard. Every artifact read is memoized on
+# (path, mtime), so an idle rerun costs one os.stat per file and no reads.
+
+
+def mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _read_csv(path, version):
+    return pd.read_csv(path)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _read_json(path, version):
+    with open(path) as f:
+        return json.load(f)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _read_bytes(path, version):
+    return artifact_store.read_bytes(path)
+
+
+def load_csv(path):
+    return _read_csv(path, mtime(path))
+
+
+def load_json(path):
+    # None when the sidecar file doesn't exist
+    version = mtime(path)
+    return None if version is None else _read_json(path, version)
+
+
+def read_bytes(path):
+    # Transparently decompresses raw artifacts stored as <path>.gz
+    return _read_bytes(path, mtime(artifact_store.resolve(path) or path))
+
+
+def download_button(label, path, mime, key, render=None):
+    # The payload is read (and, with `render`, first generated from `path`) only once
+    # the user asks for this download
+    armed = f"{key}:{path}"
+    if st.session_state.get(key) != armed:
+        if not st.button(label, key=f"{key}_prepare"):
+            return
+        st.session_state[key] = armed
+    with st.spinner("Preparing download..."):
+        target = render(path) if render else path
+    st.download_button(f"💾 Save {os.path.basename(target)}", read_bytes(target), file_name=os.path.basename(target),
+                       mime=mime, key=f"{key}_file")
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _compare(report1, report2):
+    pairs = report_diff.pair(pd.DataFrame([report1]).assign(pair_id=0), pd.DataFrame([report2]).assign(pair_id=0),
+                             "pair_id")
+    merged = report_diff.diff_pairs(pairs)
+    merged["Δ (Visual)"] = np.select(
+        [merged["Δ"] > 0, merged["Δ"] < 0, merged["Δ"] == 0],
+        ["🔺 " + merged["Δ"].astype(str), "🔻 " + merged["Δ"].abs().astype(str), "➖ 0"], "— " + merged["Change"])
+    return merged
+
+
+def compare(reports, file1, file2):
+    # Computed once per pair of catalog rows; reruns with the same pair hit the cache
+    by_path = reports.set_index("csv_path")
+    return _compare(by_path.loc[file1].to_dict(), by_path.loc[file2].to_dict())
+
+
+# Multi-report diffs; `_reports` (the catalog frame) is not hashed, `version` stands in for it
+@st.cache_data(show_spinner=False, max_entries=32)
+def diff_one_to_many(_reports, version, baseline, candidates):
+    return report_diff.one_to_many(_reports, baseline, list(candidates))
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def diff_sets(_reports, version, set_a, set_b, on="site"):
+    return report_diff.set_vs_set(_reports, list(set_a), list(set_b), on)
@@ -1,10 +1,11 @@
-import sys
 import os
 import json
+import argparse
 import asyncio
-from component_checker import check_components
+import audit_pipeline
+from component_checker import crawl_components
 
-def main(report_dir):
+def main(report_dir, crawl=False, depth=2, max_pages=100, concurrency=8):
     if not os.path.isdir(report_dir):
         print(f"❌ Folder not found: {report_dir}")
         return
@@ -15,27 +16,52 @@ def main(report_dir):
         print("❌ report_meta.json not found in the folder.")
         return
 
-    with open(meta_path) as f:
-        meta = json.load(f)
-
-    site = meta.get("site")
-    if not site:
+    meta = audit_pipeline.read_meta(report_dir)
+    if not meta.get("url") and not meta.get("site"):
         print("❌ site not found in metadata.")
         return
 
-    url = f"https://{site.replace('_', '.')}"
+    url = audit_pipeline.url_for(meta)
+
+    if crawl:
+        run_crawl(report_dir, url, depth, max_pages, concurrency)
+        return
 
     print(f"🔍 Running component check for: {url}")
     try:
-        components = asyncio.run(check_components(url))
-        with open(os.path.join(report_dir, "components.json"), "w") as f:
-            json.dump(components, f, indent=2)
+        audit_pipeline.run_components(url, report_dir, page_facts=False)
         print("✅ Component check complete and saved.")
     except Exception as e:
         print(f"❌ Component check failed: {e}")
 
+def run_crawl(report_dir, url, depth, max_pages, concurrency):
+    out_path = os.path.join(report_dir, "components_crawl.jsonl")
+    print(f"🕸️ Crawling {url} (depth {depth}, up to {max_pages} pages, {concurrency} concurrent)")
+
+    # Each page is appended as soon as it is checked, so partial crawls are kept
+    with open(out_path, "w") as out:
+        def on_result(record):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            failed = [c["selector"] for c in record.get("components", []) if c["status"] != "✅"]
+            mark = "❌" if record.get("error") else "⚠️" if failed else "✅"
+            print(f"{mark} {record['url']}")
+
+        try:
+            results = asyncio.run(crawl_components(url, depth, max_pages, concurrency, on_result=on_result))
+        except Exception as e:
+            print(f"❌ Crawl failed: {e}")
+            return
+
+    errors = sum(1 for r in results if r.get("error"))
+    print(f"✅ Crawled {len(results)} pages ({errors} errors). Saved: {out_path}")
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python run_component_check.py <path/to/report_folder>")
-    else:
-        main(sys.argv[1])
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run component checks for an existing report folder.")
+    parser.add_argument("report_dir", help="path/to/report_folder")
+    parser.add_argument("--crawl", action="store_true", help="check every same-origin page reachable from the start URL")
+    parser.add_argument("--depth", type=int, default=2, help="maximum link depth to follow when crawling")
+    parser.add_argument("--max-pages", type=int, default=100, help="maximum number of pages to check when crawling")
+    parser.add_argument("--concurrency", type=int, default=8, help="pages checked at once when crawling")
+    args = parser.parse_args()
+    main(args.report_dir, args.crawl, args.depth, args.max_pages, args.concurrency)
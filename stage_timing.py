@@ -0,0 +1,149 @@
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows: wall/CPU time only
+    resource = None
+
+# Per-stage instrumentation for audits: wall time, CPU time and peak RSS for every
+# pipeline stage, appended to <version_dir>/timings.jsonl and exportable as JSON
+# lines or Prometheus text.
+#
+# cpu_s is the CPU time of the thread that ran the stage. Stages that await work on
+# a shared event loop (the browser pool) record None instead, since the loop thread
+# also runs other audits' coroutines. children_* are measured per subprocess (see
+# add_child_usage) and are None for stages that start none. peak_rss_mb is the
+# process-wide high-water mark at the end of the stage, not a per-stage figure.
+TIMINGS_FILE = "timings.jsonl"
+FIELDS = ("wall_s", "cpu_s", "children_cpu_s", "peak_rss_mb", "children_peak_rss_mb")
+QUANTILES = (0.5, 0.95)
+
+# ru_maxrss is in KB on Linux and bytes on macOS
+_RSS_UNIT = 1024 * 1024 if sys.platform == "darwin" else 1024
+_child_lock = threading.Lock()
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT / 1e6, 1)
+
+
+def add_child_usage(record, usage):
+    # Fold the rusage of one finished subprocess (from os.wait4) into a stage record;
+    # parallel runs (sampled Lighthouse) add up CPU and keep the largest peak RSS
+    if record is None or usage is None:
+        return
+    with _child_lock:
+        record["children_cpu_s"] = round((record.get("children_cpu_s") or 0) + usage.ru_utime + usage.ru_stime, 4)
+        record["children_peak_rss_mb"] = max(record.get("children_peak_rss_mb") or 0,
+                                             round(usage.ru_maxrss * _RSS_UNIT / 1e6, 1))
+
+
+class StageTimer:
+    def __init__(self, **labels):
+        self.labels = labels
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, cpu=True):
+        # Records the stage even when it raises (ok=False)
+        record = {"stage": name, "started": time.time(), "ok": False, **self.labels}
+        wall, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+            record["ok"] = True
+        finally:
+            record.update({
+                "wall_s": round(time.perf_counter() - wall, 4),
+                "cpu_s": round(time.thread_time() - cpu_start, 4) if cpu else None,
+                "peak_rss_mb": _peak_rss_mb(),
+            })
+            record.setdefault("children_cpu_s", None)
+            record.setdefault("children_peak_rss_mb", None)
+            self.records.append(record)
+
+    def write(self, version_dir):
+        with open(os.path.join(version_dir, TIMINGS_FILE), "a") as f:
+            for record in self.records:
+                f.write(json.dumps(record) + "\n")
+
+
+def timed(timer, name, cpu=True):
+    # timer.stage(name), or a no-op when the caller is not timing
+    return timer.stage(name, cpu) if timer is not None else nullcontext()
+
+
+def load_recent(artifacts_dir="artifacts", limit=200):
+    # Stage records of the `limit` most recently timed audits
+    paths = sorted(glob.glob(os.path.join(artifacts_dir, "*", TIMINGS_FILE)), key=os.path.getmtime)[-limit:]
+    records = []
+    for path in paths:
+        folder = os.path.basename(os.path.dirname(path))
+        with open(path) as f:
+            records.extend({"folder": folder, **json.loads(line)} for line in f if line.strip())
+    return records
+
+
+def quantile(values, q):
+    # Linear interpolation between closest ranks (numpy's default); None without values
+    values = sorted(values)
+    if not values:
+        return None
+    pos = (len(values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def summarize(records, quantiles=QUANTILES):
+    # {stage: {"count": n, "<field>": {q: value}}} in first-seen stage order
+    by_stage = {}
+    for record in records:
+        by_stage.setdefault(record["stage"], []).append(record)
+    return {
+        stage: {"count": len(rows), **{
+            field: {q: quantile([r[field] for r in rows if r.get(field) is not None], q) for q in quantiles}
+            for field in FIELDS
+        }}
+        for stage, rows in by_stage.items()
+    }
+
+
+def to_jsonl(records):
+    return "".join(json.dumps(r) + "\n" for r in records)
+
+
+def to_prometheus(records, quantiles=QUANTILES):
+    # Prometheus text exposition: one summary per field, labelled by stage
+    summary = summarize(records, quantiles)
+    lines = []
+    for field in FIELDS:
+        name = "ux_audit_stage_" + (field[:-2] + "_seconds" if field.endswith("_s") else field)
+        lines.append(f"# TYPE {name} summary")
+        for stage, stats in summary.items():
+            measured = [r[field] for r in records if r["stage"] == stage and r.get(field) is not None]
+            if not measured:
+                continue
+            for q, value in stats[field].items():
+                lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {value:.4f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {sum(measured):.4f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {len(measured)}')
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Export per-stage audit timings.")
+    parser.add_argument("--artifacts-dir", default="artifacts")
+    parser.add_argument("--limit", type=int, default=200, help="number of most recent audits")
+    parser.add_argument("--format", choices=["prom", "jsonl"], default="prom")
+    args = parser.parse_args()
+    records = load_recent(args.artifacts_dir, args.limit)
+    sys.stdout.write(to_prometheus(records) if args.format == "prom" else to_jsonl(records))
@@ -0,0 +1,135 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+# Headless entry point for CI: runs the dashboard's audit pipeline over a URL list
+# and checks the results against metric budgets. The pipeline (pandas, Playwright,
+# aiohttp) is imported only once arguments are valid, and nothing here pulls in
+# Streamlit, matplotlib or WeasyPrint.
+#
+#   python ux_audit.py https://example.com --budget performance=90 --budget lcp=2500
+#   python ux_audit.py --file urls.txt --workers 8 --runs 3 --output summary.json
+#
+# Exit status: 0 all good, 1 budget violations (including budgeted metrics the
+# report lacks), 2 failed audits, 3 both (argparse usage errors also exit 2).
+EXIT_BUDGET = 1
+EXIT_FAILED = 2
+
+
+def parse_budgets(items, budget_file=None):
+    # {"performance": 90, "lcp": 2500}; a budget file holds the same mapping as JSON
+    budgets = {}
+    if budget_file:
+        with open(budget_file) as f:
+            budgets.update({k: float(v) for k, v in json.load(f).items()})
+    for item in items or []:
+        metric, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Budget must look like metric=value: {item}")
+        budgets[metric.strip()] = float(value)
+    return budgets
+
+
+def report_metrics(folder):
+    # Catalog-column -> value for the report analyze_ux wrote into `folder`
+    import report_catalog
+    summaries = glob.glob(os.path.join(folder, "ux_report_*.json"))
+    if not summaries:
+        return {}
+    with open(summaries[0]) as f:
+        scores = json.load(f).get("Core Scores", {})
+    return {report_catalog.METRIC_COLUMNS[label]: value for label, value in scores.items()
+            if label in report_catalog.METRIC_COLUMNS}
+
+
+def check_budgets(metrics, budgets):
+    # Scores are minimums, timings are maximums; a budgeted metric the report lacks fails too
+    import report_catalog
+    violations = []
+    for metric, budget in budgets.items():
+        value = metrics.get(metric)
+        is_score = metric in report_catalog.SCORE_COLUMNS
+        if value is None or ((value < budget) if is_score else (value > budget)):
+            violations.append({"metric": metric, "value": value, "budget": budget, "limit": "min" if is_score else "max"})
+    return violations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="ux-audit", description="Run UX audits headlessly and enforce metric budgets.")
+    parser.add_argument("urls", nargs="*", help="URLs to audit")
+    parser.add_argument("--file", help="URL list: one per line, or a .csv with URLs in the first column")
+    parser.add_argument("--workers", type=int, default=4, help="audits run at once")
+    parser.add_argument("--runs", type=int, default=1, help="Lighthouse runs per URL (median of N)")
+    parser.add_argument("--cache", action="store_true", help="reuse cached Lighthouse results for unchanged pages")
+    parser.add_argument("--budget", action="append", metavar="METRIC=VALUE",
+                        help="e.g. performance=90 (minimum) or lcp=2500 (maximum, ms); repeatable")
+    parser.add_argument("--budget-file", help='JSON budgets, e.g. {"performance": 90, "lcp": 2500}')
+    parser.add_argument("--artifacts-dir", default="artifacts")
+    parser.add_argument("--output", help="also write the JSON summary to this file")
+    parser.add_argument("--quiet", action="store_true", help="no progress on stderr")
+    args = parser.parse_args(argv)
+
+    try:
+        budgets = parse_budgets(args.budget, args.budget_file)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    import audit_pipeline
+    import report_catalog
+
+    unknown = set(budgets) - set(report_catalog.METRIC_COLUMNS.values())
+    if unknown:
+        parser.error(f"Unknown budget metrics: {', '.join(sorted(unknown))} "
+                     f"(choose from {', '.join(report_catalog.METRIC_COLUMNS.values())})")
+
+    text, csv_text = "\n".join(args.urls), ""
+    if args.file:
+        with open(args.file, encoding="utf-8", errors="ignore", newline="") as f:
+            if args.file.lower().endswith(".csv"):
+                csv_text = f.read()
+            else:
+                text += "\n" + f.read()
+    urls = audit_pipeline.parse_url_list(text, csv_text)
+    if not urls:
+        parser.error("No valid http(s) URLs given.")
+
+    def on_stage(url, stage):
+        if not args.quiet:
+            print(f"[{stage}] {url}", file=sys.stderr, flush=True)
+
+    started = time.time()
+    audits = []
+    for result in audit_pipeline.run_batch(urls, args.workers, args.artifacts_dir, on_stage, use_cache=args.cache,
+                                           runs=args.runs):
+        ok = result["Status"] == "✅"
+        # Failed audits count as failed, not as over budget
+        result["Metrics"] = report_metrics(result["Folder"]) if ok else {}
+        result["Budget Violations"] = check_budgets(result["Metrics"], budgets) if ok else []
+        audits.append(result)
+
+    failed = sum(1 for a in audits if a["Status"] != "✅")
+    over_budget = sum(1 for a in audits if a["Budget Violations"])
+    exit_code = (EXIT_BUDGET if over_budget else 0) | (EXIT_FAILED if failed else 0)
+    summary = {
+        "seconds": round(time.time() - started, 1),
+        "workers": args.workers,
+        "runs": args.runs,
+        "budgets": budgets,
+        "totals": {"audits": len(audits), "failed": failed, "over_budget": over_budget},
+        "exit_code": exit_code,
+        "audits": audits,
+    }
+
+    text = json.dumps(summary, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())